@@ -1,107 +1,71 @@
-from matsim.utils import open_by_extension
 import matsim.network
 import matsim.facilities
-import numpy.linalg as la
-import numpy as np
-import re, pickle
+import matsim.intermediates
 
 THRESHOLD = 500
 
 """
     Shrinks the network in a way that a bounding box around all the facility
     locations from the original facilities file is generated with an additional
-    configurable threshold. Crossing links are shortened while outside nodes and
-    links are deleted.
+    configurable threshold. Crossing links are cut at the boundary while outside
+    nodes and links are deleted.
 
     Input is network_transformed.xml and output is network_shrunk.xml.
 """
 
-# Load network and facilities
+# Load network
 
 network = matsim.network.Network()
-matsim.network.NetworkReader(network).read('network_transformed.xml')
-
-facility_ids, facility_coords = [], []
-
-for id, facility in matsim.facilities.FacilitiesReader().read('siouxfalls-2014/Siouxfalls_facilities.xml.gz').items():
-    facility_ids.append(id)
-    facility_coords.append(facility.coords)
-
-facility_coords = np.array(facility_coords)
+matsim.network.NetworkReader(network).read('network_transformed.xml', cache = True)
 
 # Find bounding box
 
-minimum = np.min(facility_coords, axis=0)
-maximum = np.max(facility_coords, axis=0)
+minimum, maximum, count = matsim.facilities.FacilitiesReader().compute_bounding_box('siouxfalls-2014/Siouxfalls_facilities.xml.gz')
 
 minimum -= THRESHOLD
 maximum += THRESHOLD
 
-# Find all outside nodes
-
-is_outside = lambda x: (x < minimum).any() or (x > maximum).any()
-outside_nodes = [node_id for node_id, node in network.nodes.items() if is_outside(node.coords)]
-
-# Find all links that are completely outside or crossing the boundary
-
-outside_links = []
-crossing_links = []
-
-for link_id, link in network.links.items():
-    from_outside = link.from_node_id in outside_nodes
-    to_outside = link.to_node_id in outside_nodes
-
-    if from_outside and to_outside:
-        outside_links.append(link)
-    elif from_outside or to_outside:
-        crossing_links.append(link)
-        #outside_links.append(link)
+# Clip the network at the bounding box
 
-# Move the outside node of the crossing links
+shrunk, diagnostics = network.clip((minimum, maximum))
+clipped_links = set(diagnostics['crossing_links'] + diagnostics['passing_links'])
 
-moved_nodes = []
-
-for link in crossing_links:
-    node_id = link.from_node_id if link.from_node_id in outside_nodes else link.to_node_id
-    node = network.nodes[node_id]
-    moved_nodes.append(node_id)
-
-    # TODO: Could be improved by finding the actual intersection point
-    node.coords[0] = max(node.coords[0], minimum[0])
-    node.coords[0] = min(node.coords[0], maximum[0])
-    node.coords[1] = max(node.coords[1], minimum[1])
-    node.coords[1] = min(node.coords[1], maximum[1])
+# Write changes
+class Transformer(matsim.network.NetworkRewriter):
+    def transform_node(self, node_id, attributes):
+        if node_id in shrunk.nodes:
+            node = shrunk.nodes[node_id]
 
-# Find the nodes that haven't been moved (and thus can be deleted)
+            attributes['x'] = '%f' % node.coords[0]
+            attributes['y'] = '%f' % node.coords[1]
 
-outside_nodes = set(outside_nodes).difference(set(moved_nodes))
+            return attributes
+        else:
+            return None
 
-# Remove nodes and links
-for node_id in outside_nodes: del network.nodes[node_id]
-for link in outside_links: del network.links[link.id]
+    def transform_link(self, id, attributes):
+        if not id in shrunk.links: return None
 
-# Write changes
-class Transformer(matsim.network.NetworkTransformer):
-    def transform_node(self, node_id, line):
-        if node_id in network.nodes:
-            node = network.nodes[node_id]
+        if id in clipped_links:
+            link = shrunk.links[id]
 
-            line = re.sub(' x="(.+?)"', ' x="%f"' % node.coords[0], line)
-            line = re.sub(' y="(.+?)"', ' y="%f"' % node.coords[1], line)
+            attributes['from'] = link.from_node_id
+            attributes['to'] = link.to_node_id
+            attributes['length'] = '%f' % link.length
 
-            return line
-        else:
-            return None
+        return attributes
 
-    def transform_link(self, id, line):
-        return None if not id in network.links else line
+    def insert_nodes(self):
+        nodes = [shrunk.nodes[node_id] for node_id in diagnostics['created_nodes']]
+        return [{ 'id' : node.id, 'x' : '%f' % node.coords[0], 'y' : '%f' % node.coords[1] } for node in nodes]
 
 Transformer().transform('network_transformed.xml', 'network_shrunk.xml')
 
-print('Found %d crossing links and %d outside' % (len(crossing_links), len(outside_links)))
+print('Found %d crossing links and %d outside' % (len(clipped_links), len(diagnostics['outside_links'])))
+print('Moved %d nodes and created %d nodes' % (len(diagnostics['moved_nodes']), len(diagnostics['created_nodes'])))
 
 # Write debug information
-with open('network_shrunk.dat', 'wb+') as f:
-    outside_links = [link.id for link in outside_links]
-    crossing_links = [link.id for link in crossing_links]
-    pickle.dump((outside_links, crossing_links, outside_nodes, moved_nodes), f)
+matsim.intermediates.write_id_lists('network_shrunk.npz',
+    outside_links = diagnostics['outside_links'], clipped_links = sorted(clipped_links),
+    outside_nodes = diagnostics['outside_nodes'], moved_nodes = diagnostics['moved_nodes'],
+    created_nodes = diagnostics['created_nodes'])
@@ -1,8 +1,6 @@
 import matsim.network
 import matsim.transit
-import pickle
-import numpy as np
-import numpy.linalg as la
+import matsim.intermediates
 
 """
 
@@ -12,14 +10,15 @@ import pt_skeleton
 skeleton = pt_skeleton.SKELETON
 
 network = matsim.network.Network()
-matsim.network.NetworkReader(network).read('network_clean.xml')
+matsim.network.NetworkReader(network).read('network_clean.xml', cache = True)
 
 class TravelTimeDijkstra(matsim.network.Dijkstra):
     def compute_cost(self, link):
-        return link.length / link.freespeed
+        return link.length / float(link.attributes['freespeed'])
 
 cache = matsim.network.DijkstraCache(network)
 dijkstra = TravelTimeDijkstra(network, cache)
+heuristic = matsim.network.EuclideanHeuristic(dijkstra)
 
 routes = {}
 
@@ -28,11 +27,10 @@ for route_id, skeleton_nodes in skeleton.items():
     links = []
 
     for i in range(1, len(skeleton_nodes)):
-        result = dijkstra.find_route(skeleton_nodes[i-1], skeleton_nodes[i])
+        result = dijkstra.find_route(skeleton_nodes[i-1], skeleton_nodes[i], heuristic)
         nodes += result[0][1:]
         links += result[1]
 
     routes[route_id] = (nodes, links)
 
-with open('routes.dat', 'wb+') as f:
-    pickle.dump(routes, f)
+matsim.intermediates.write_routes('routes.npz', routes)
@@ -1,6 +1,6 @@
 import matsim.network
 import matsim.transit
-import pickle
+import matsim.intermediates
 import numpy as np
 import numpy.linalg as la
 import matplotlib.pyplot as plt
@@ -13,7 +13,7 @@ import matplotlib.pyplot as plt
 
 class PTLinePlotter(matsim.network.NetworkPlotter):
     def __init__(self, network, route):
-        matsim.network.NetworkPlotter.__init__(self, network)
+        matsim.network.NetworkPlotter.__init__(self, network, batched = True)
         self.route = route
 
     def get_link_style(self, link):
@@ -23,13 +23,12 @@ class PTLinePlotter(matsim.network.NetworkPlotter):
             return None
 
 network = matsim.network.Network()
-matsim.network.NetworkReader(network).read('network_clean.xml')
+matsim.network.NetworkReader(network).read('network_clean.xml', cache = True)
 
 schedule = matsim.transit.TransitSchedule()
 matsim.transit.TransitScheduleReader(schedule).read('siouxfalls-2014/Siouxfalls_transitSchedule.xml')
 
-with open('routes.dat', 'rb') as f:
-    routes = pickle.load(f)
+routes = matsim.intermediates.read_routes('routes.npz')
 
 locations = []
 
@@ -45,7 +44,7 @@ def select_stop_location(event):
 figure = plt.figure()
 figure.canvas.mpl_connect('button_press_event', select_stop_location)
 
-network_plotter = matsim.network.NetworkPlotter(network)
+network_plotter = matsim.network.NetworkPlotter(network, batched = True)
 network_plotter.plot()
 
 for line_id in schedule.lines:
@@ -58,8 +57,7 @@ for line, route in routes.items():
 
 plt.show()
 
-with open('stop_locations.dat', 'wb+') as f:
-    pickle.dump(locations, f)
+matsim.intermediates.write_locations('stop_locations.npz', locations)
 
 
 ## Step 2: Select which stops belong to which lines
@@ -93,5 +91,4 @@ for line_id, route in routes.items():
 
     plt.show()
 
-with open('stop_assignments.dat', 'wb+') as f:
-    pickle.dump(line_assignments, f)
+matsim.intermediates.write_assignments('stop_assignments.npz', line_assignments)
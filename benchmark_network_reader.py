@@ -0,0 +1,33 @@
+import matsim.network
+import sys, time
+
+"""
+    Compares the SAX based NetworkReader with the expat based
+    FastNetworkReader (object model and columnar arrays).
+
+    Usage: python benchmark_network_reader.py [network.xml[.gz] ...]
+"""
+
+REPETITIONS = 3
+
+paths = sys.argv[1:] if len(sys.argv) > 1 else ['network_josm.xml']
+
+def measure(read):
+    timings = []
+
+    for repetition in range(REPETITIONS):
+        start = time.time()
+        read()
+        timings.append(time.time() - start)
+
+    return min(timings)
+
+for path in paths:
+    sax = measure(lambda: matsim.network.NetworkReader(matsim.network.Network()).read(path))
+    objects = measure(lambda: matsim.network.FastNetworkReader(matsim.network.Network()).read(path))
+    arrays = measure(lambda: matsim.network.FastNetworkReader().read_arrays(path))
+
+    print(path)
+    print('    SAX reader:         %8.3fs' % sax)
+    print('    Fast reader:        %8.3fs (%.1fx)' % (objects, sax / objects))
+    print('    Fast reader arrays: %8.3fs (%.1fx)' % (arrays, sax / arrays))
@@ -0,0 +1,37 @@
+import matsim.transit
+import numpy as np
+import collections, sys
+
+"""
+    Prints statistics per transit line and the most used links of a schedule.
+    The schedule is streamed into compact arrays without one object per
+    departure, so this also works for large regional schedules.
+
+    Usage: python check_schedule.py [schedule.xml[.gz]]
+"""
+
+path = sys.argv[1] if len(sys.argv) > 1 else 'schedule.xml'
+schedule = matsim.transit.CompactTransitSchedule().read(path)
+
+line_statistics = collections.OrderedDict()
+link_usage = np.zeros(len(schedule.link_ids), dtype = np.int64)
+
+for line_id, routes in schedule.lines.items():
+    statistics = [len(routes), 0, 0]
+    line_statistics[line_id] = statistics
+
+    for route in routes.values():
+        departures = route.get_departure_count()
+
+        statistics[1] += len(route.stop_indices)
+        statistics[2] += departures
+
+        np.add.at(link_usage, route.link_indices, departures)
+
+for line_id, (routes, stops, departures) in line_statistics.items():
+    print('%s: %d routes, %d stops, %d departures' % (line_id, routes, stops, departures))
+
+print('Most used links (vehicles per day):')
+
+for index in np.argsort(-link_usage, kind = 'stable')[:10]:
+    print('    %s: %d' % (schedule.link_ids[index], link_usage[index]))
@@ -0,0 +1,27 @@
+import matsim.network
+import matsim.transit
+import matsim.rendering
+import sys
+
+"""
+    Exports map tiles of network_final.xml with the transit routes from
+    schedule.xml highlighted. Tiles are written to tiles/zoom/x/y.png.
+
+    Usage: python export_tiles.py [maximum zoom] [processes]
+"""
+
+MAXIMUM_ZOOM = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+PROCESSES = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+COLORS = ['r', 'g', 'b', 'c', 'm']
+
+network = matsim.network.Network()
+matsim.network.NetworkReader(network).read('network_final.xml', cache = True)
+
+highlights = []
+
+for index, (line_id, route) in enumerate(matsim.transit.iterate_transit_routes('schedule.xml')):
+    highlights.append((route.links, { 'color' : COLORS[index % len(COLORS)], 'linewidth' : 2.0 }))
+
+paths = matsim.rendering.export_tiles(network, 'tiles', range(MAXIMUM_ZOOM + 1), processes = PROCESSES, highlights = highlights)
+print('Wrote %d tiles' % len(paths))
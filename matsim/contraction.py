@@ -0,0 +1,220 @@
+import numpy as np
+import heapq
+
+# Edges are stored as { other node index : (cost, via node index, link index) }
+# where original links have via = -1 and shortcuts have link = -1.
+
+class ContractionHierarchy:
+    def __init__(self, dijkstra):
+        self.dijkstra = dijkstra
+        self.cache = dijkstra.cache
+
+        self.rank = None
+        self.upward = None
+        self.downward = None
+
+    def _make_graph(self):
+        costs = self.dijkstra.get_costs().tolist()
+        outgoing = [{} for node_id in self.cache.node_ids]
+        incoming = [{} for node_id in self.cache.node_ids]
+
+        for link_index in range(len(self.cache.link_ids)):
+            u, v = self.cache.link_from[link_index], self.cache.link_to[link_index]
+            if u == v: continue
+
+            # Only the cheapest of several parallel links is relevant
+            if v not in outgoing[u] or costs[link_index] < outgoing[u][v][0]:
+                outgoing[u][v] = incoming[v][u] = (costs[link_index], -1, link_index)
+
+        return outgoing, incoming
+
+    def _find_witnesses(self, outgoing, source, excluded, limit, witness_limit):
+        distances = { source : 0.0 }
+        queue = [(0.0, source)]
+        settled = 0
+
+        while len(queue) > 0 and settled < witness_limit:
+            distance, current = heapq.heappop(queue)
+
+            if distance > distances[current]: continue
+            if distance > limit: break
+            settled += 1
+
+            for destination, edge in outgoing[current].items():
+                if destination == excluded: continue
+                proposal = distance + edge[0]
+
+                if proposal < distances.get(destination, np.inf):
+                    distances[destination] = proposal
+                    heapq.heappush(queue, (proposal, destination))
+
+        return distances
+
+    def _find_shortcuts(self, outgoing, incoming, node, witness_limit):
+        shortcuts = []
+
+        for u, incoming_edge in incoming[node].items():
+            targets = [(v, incoming_edge[0] + outgoing_edge[0]) for v, outgoing_edge in outgoing[node].items() if v != u]
+            if len(targets) == 0: continue
+
+            limit = max(cost for v, cost in targets)
+            distances = self._find_witnesses(outgoing, u, node, limit, witness_limit)
+
+            for v, cost in targets:
+                if distances.get(v, np.inf) > cost:
+                    shortcuts.append((u, v, cost))
+
+        return shortcuts
+
+    def _get_priority(self, outgoing, incoming, node, contracted_neighbours, witness_limit):
+        shortcuts = self._find_shortcuts(outgoing, incoming, node, witness_limit)
+        return len(shortcuts) - len(outgoing[node]) - len(incoming[node]) + contracted_neighbours[node]
+
+    def build(self, witness_limit = 500):
+        outgoing, incoming = self._make_graph()
+        count = len(self.cache.node_ids)
+
+        contracted_neighbours = [0] * count
+        queue = [(self._get_priority(outgoing, incoming, node, contracted_neighbours, witness_limit), node) for node in range(count)]
+        heapq.heapify(queue)
+
+        self.rank = np.zeros(count, dtype = np.int64)
+        self.upward = [None] * count
+        self.downward = [None] * count
+        contracted = 0
+
+        while len(queue) > 0:
+            priority, node = heapq.heappop(queue)
+
+            # Lazy update of the node order
+            priority = self._get_priority(outgoing, incoming, node, contracted_neighbours, witness_limit)
+
+            if len(queue) > 0 and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, node))
+                continue
+
+            for u, v, cost in self._find_shortcuts(outgoing, incoming, node, witness_limit):
+                if v not in outgoing[u] or cost < outgoing[u][v][0]:
+                    outgoing[u][v] = incoming[v][u] = (cost, node, -1)
+
+            # Remaining edges of the node all lead to higher ranked nodes
+            self.rank[node] = contracted
+            self.upward[node] = outgoing[node]
+            self.downward[node] = incoming[node]
+            contracted += 1
+
+            for neighbour in set(outgoing[node]) | set(incoming[node]):
+                contracted_neighbours[neighbour] += 1
+                outgoing[neighbour].pop(node, None)
+                incoming[neighbour].pop(node, None)
+
+            outgoing[node], incoming[node] = {}, {}
+
+    def _search(self, source, target):
+        distances = ({ source : 0.0 }, { target : 0.0 })
+        previous = ({}, {})
+        graphs = (self.upward, self.downward)
+        queues = ([(0.0, source)], [(0.0, target)])
+
+        best, meeting = np.inf, None
+
+        # Bidirectional search on the upward graphs
+        while len(queues[0]) > 0 or len(queues[1]) > 0:
+            direction = 0 if len(queues[1]) == 0 or (len(queues[0]) > 0 and queues[0][0][0] <= queues[1][0][0]) else 1
+            distance, current = heapq.heappop(queues[direction])
+
+            if distance >= best: break
+            if distance > distances[direction][current]: continue
+
+            other = distances[1 - direction].get(current, np.inf)
+
+            if distance + other < best:
+                best, meeting = distance + other, current
+
+            for neighbour, edge in graphs[direction][current].items():
+                proposal = distance + edge[0]
+
+                if proposal < distances[direction].get(neighbour, np.inf):
+                    distances[direction][neighbour] = proposal
+                    previous[direction][neighbour] = current
+                    heapq.heappush(queues[direction], (proposal, neighbour))
+
+        return best, meeting, previous
+
+    def _unpack(self, u, v):
+        links = []
+        stack = [(u, v)]
+
+        while len(stack) > 0:
+            u, v = stack.pop()
+            cost, via, link = self.upward[u][v] if self.rank[u] < self.rank[v] else self.downward[v][u]
+
+            if via < 0:
+                links.append(link)
+            else:
+                stack.append((via, v))
+                stack.append((u, via))
+
+        return links
+
+    def find_route(self, from_node_id, to_node_id):
+        source = self.cache.node_indices[from_node_id]
+        target = self.cache.node_indices[to_node_id]
+
+        cost, meeting, previous = self._search(source, target)
+
+        if meeting is None:
+            return [to_node_id], [], np.inf
+
+        # Chain of hierarchy edges from source over the meeting node to target
+        chain = [meeting]
+        while chain[0] != source: chain.insert(0, previous[0][chain[0]])
+        while chain[-1] != target: chain.append(previous[1][chain[-1]])
+
+        link_indices = []
+
+        for i in range(1, len(chain)):
+            link_indices += self._unpack(chain[i - 1], chain[i])
+
+        nodes = [from_node_id] + [self.cache.node_ids[self.cache.link_to[index]] for index in link_indices]
+        links = [self.cache.link_ids[index] for index in link_indices]
+
+        return nodes, links, cost
+
+    def save(self, path):
+        arrays = { 'rank' : self.rank, 'node_ids' : np.array(self.cache.node_ids), 'link_ids' : np.array(self.cache.link_ids) }
+
+        # The shortcuts are only valid for the link costs they were built with
+        arrays['link_costs'] = self.dijkstra.get_costs()
+
+        for name, graph in (('upward', self.upward), ('downward', self.downward)):
+            edges = [(node, other) + edge for node in range(len(graph)) for other, edge in graph[node].items()]
+            edges = np.array(edges, dtype = np.float64).reshape((-1, 5))
+
+            arrays[name + '_nodes'] = edges[:, 0:2].astype(np.int64)
+            arrays[name + '_costs'] = edges[:, 2]
+            arrays[name + '_via'] = edges[:, 3].astype(np.int64)
+            arrays[name + '_links'] = edges[:, 4].astype(np.int64)
+
+        with open(path, 'wb+') as f:
+            np.savez(f, **arrays)
+
+    def load(self, path):
+        with np.load(path) as data:
+            if data['node_ids'].tolist() != self.cache.node_ids or data['link_ids'].tolist() != self.cache.link_ids:
+                raise RuntimeError('Contraction hierarchy in %s does not match the network' % path)
+
+            if not 'link_costs' in data.files or not np.array_equal(data['link_costs'], self.dijkstra.get_costs()):
+                raise RuntimeError('Contraction hierarchy in %s was built with different link costs' % path)
+
+            self.rank = data['rank']
+
+            for name in ('upward', 'downward'):
+                graph = [{} for node_id in self.cache.node_ids]
+                nodes = data[name + '_nodes'].tolist()
+                edges = zip(data[name + '_costs'].tolist(), data[name + '_via'].tolist(), data[name + '_links'].tolist())
+
+                for (node, other), edge in zip(nodes, edges):
+                    graph[node][other] = edge
+
+                setattr(self, name, graph)
@@ -1,7 +1,10 @@
 from . import utils
-import xml.sax
+import xml.sax, xml.parsers.expat
 import numpy as np
 
+# Number of facilities per chunk returned by FacilitiesReader.read_chunks
+FACILITY_CHUNK_SIZE = 2**16
+
 class Facility:
     def __init__(self, id, coords):
         self.id = id
@@ -28,4 +31,70 @@ class FacilitiesReader(xml.sax.ContentHandler):
 
     def _read_facility(self, attributes):
         id, x, y = (attributes[k] for k in ('id', 'x', 'y'))
-        self.facilities[id] = Facility(id, np.array((x,y)).astype(np.float))
+        self.facilities[id] = Facility(id, np.array((x,y)).astype(np.float64))
+
+    def read_chunks(self, path, chunk_size = FACILITY_CHUNK_SIZE, activities = False, block_size = 2**20):
+        # Streams the file and yields (ids, coords) per chunk of facilities,
+        # with activities also a list of activity type tuples per facility
+        ids, xs, ys, types = [], [], [], []
+
+        def start_element(name, attributes):
+            if name == 'facility':
+                ids.append(attributes['id'])
+                xs.append(attributes['x'])
+                ys.append(attributes['y'])
+                types.append([])
+
+            elif name == 'activity' and activities:
+                types[-1].append(attributes['type'])
+
+        parser = xml.parsers.expat.ParserCreate()
+        parser.StartElementHandler = start_element
+
+        def make_chunk(count):
+            coords = np.empty((count, 2), dtype = np.float64)
+            coords[:, 0] = np.array(xs[:count], dtype = np.float64)
+            coords[:, 1] = np.array(ys[:count], dtype = np.float64)
+
+            chunk = (ids[:count], coords, [tuple(item) for item in types[:count]]) if activities else (ids[:count], coords)
+            del ids[:count], xs[:count], ys[:count], types[:count]
+
+            return chunk
+
+        with utils.open_by_extension(path, 'rb') as f:
+            while True:
+                block = f.read(block_size)
+                parser.Parse(block, len(block) == 0)
+
+                # The last facility is held back as it may still get activities
+                while len(ids) > chunk_size:
+                    yield make_chunk(chunk_size)
+
+                if len(block) == 0: break
+
+        if len(ids) > 0:
+            yield make_chunk(len(ids))
+
+    def read_arrays(self, path, activities = False):
+        chunks = list(self.read_chunks(path, activities = activities))
+
+        ids = [id for chunk in chunks for id in chunk[0]]
+        coords = np.vstack([chunk[1] for chunk in chunks] + [np.zeros((0, 2))])
+
+        if activities:
+            return ids, coords, [item for chunk in chunks for item in chunk[2]]
+
+        return ids, coords
+
+    def compute_bounding_box(self, path):
+        # Returns minimum, maximum and number of facilities without keeping them
+        minimum = np.array((np.inf, np.inf))
+        maximum = np.array((-np.inf, -np.inf))
+        count = 0
+
+        for chunk in self.read_chunks(path):
+            minimum = np.minimum(minimum, np.min(chunk[1], axis = 0))
+            maximum = np.maximum(maximum, np.max(chunk[1], axis = 0))
+            count += len(chunk[0])
+
+        return minimum, maximum, count
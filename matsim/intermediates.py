@@ -0,0 +1,212 @@
+"""
+    Columnar storage for the intermediate results of the scenario scripts. All
+    files are uncompressed .npz archives without pickled objects. Variable
+    length data (routes, stop assignments, adjacency lists) is stored as one
+    flat value array per column plus an offset array. Arrays are memory mapped
+    when the file is opened and only the requested slices are decoded.
+
+    Legacy pickles can be converted with
+
+        python -m matsim.intermediates routes.dat stop_locations.dat ...
+"""
+
+import numpy as np
+import zipfile, struct, pickle, os, sys
+
+def _map_array(path, archive, name):
+    # Members written by np.savez are stored uncompressed, so the array data
+    # can be mapped directly from the archive
+    info = archive.getinfo(name + '.npy')
+
+    if info.compress_type != zipfile.ZIP_STORED:
+        with archive.open(info) as f:
+            return np.lib.format.read_array(f, allow_pickle = False)
+
+    with open(path, 'rb') as f:
+        f.seek(info.header_offset)
+        header = f.read(30)
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        offset = f.tell()
+
+    if dtype.hasobject:
+        raise RuntimeError('%s in %s contains objects' % (name, path))
+
+    if np.prod(shape) == 0:
+        return np.zeros(shape, dtype = dtype)
+
+    return np.memmap(path, dtype = dtype, mode = 'r', offset = offset, shape = shape, order = 'F' if fortran_order else 'C')
+
+class ColumnFile:
+    def __init__(self, path):
+        self.path = path
+        self.arrays = {}
+
+        with zipfile.ZipFile(path) as archive:
+            self.names = [name[:-4] for name in archive.namelist() if name.endswith('.npy')]
+
+            for name in self.names:
+                self.arrays[name] = _map_array(path, archive, name)
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+def _write_arrays(path, arrays):
+    temporary_path = path + '.tmp'
+
+    with open(temporary_path, 'wb+') as f:
+        np.savez(f, **arrays)
+
+    os.replace(temporary_path, path)
+
+def _make_strings(values):
+    # Fixed width UTF-8 byte strings keep the files compact and free of pickles
+    values = [str(value).encode('utf-8') for value in values]
+    return np.array(values, dtype = 'S%d' % max([1] + [len(value) for value in values]))
+
+def _to_list(array):
+    if array.dtype.kind == 'S':
+        return [value.decode('utf-8') for value in array.tolist()]
+
+    return array.tolist()
+
+def _make_offsets(groups):
+    return np.cumsum([0] + [len(group) for group in groups]).astype(np.int64)
+
+class RaggedTable:
+    # Maps keys to one or more variable length columns. Rows are decoded only
+    # when they are accessed.
+
+    def __init__(self, data, columns):
+        self.data = data
+        self.columns = columns
+        self.key_list = _to_list(data['keys'])
+        self.indices = { key : index for index, key in enumerate(self.key_list) }
+
+    def get(self, key, column):
+        index = self.indices[key]
+        offsets = self.data['%s_offsets' % column]
+        return _to_list(self.data['%s_values' % column][offsets[index]:offsets[index + 1]])
+
+    def __getitem__(self, key):
+        values = tuple(self.get(key, column) for column in self.columns)
+        return values[0] if len(values) == 1 else values
+
+    def __contains__(self, key):
+        return key in self.indices
+
+    def __iter__(self):
+        return iter(self.key_list)
+
+    def __len__(self):
+        return len(self.key_list)
+
+    def keys(self):
+        return list(self.key_list)
+
+    def values(self):
+        return [self[key] for key in self.key_list]
+
+    def items(self):
+        return [(key, self[key]) for key in self.key_list]
+
+def _write_ragged(path, keys, columns, make_values):
+    keys = list(keys)
+    arrays = { 'keys' : _make_strings(keys) }
+
+    for column, rows in columns.items():
+        arrays['%s_offsets' % column] = _make_offsets(rows)
+        arrays['%s_values' % column] = make_values([value for row in rows for value in row])
+
+    _write_arrays(path, arrays)
+
+# Routes: { route_id : (node ids, link ids) }
+
+def write_routes(path, routes):
+    route_ids = list(routes.keys())
+    columns = { 'nodes' : [routes[route_id][0] for route_id in route_ids], 'links' : [routes[route_id][1] for route_id in route_ids] }
+    _write_ragged(path, route_ids, columns, _make_strings)
+
+def read_routes(path):
+    return RaggedTable(ColumnFile(path), ['nodes', 'links'])
+
+# Stop locations: array of coordinates
+
+def write_locations(path, locations):
+    _write_arrays(path, { 'coords' : np.array(locations, dtype = np.float64).reshape((-1, 2)) })
+
+def read_locations(path):
+    return ColumnFile(path)['coords']
+
+# Stop assignments: { line_id : [location index, ...] }
+
+def write_assignments(path, assignments):
+    line_ids = list(assignments.keys())
+    _write_ragged(path, line_ids, { 'stops' : [assignments[line_id] for line_id in line_ids] }, lambda values: np.array(values, dtype = np.int64))
+
+def read_assignments(path):
+    return RaggedTable(ColumnFile(path), ['stops'])
+
+# Adjacency lists: { node_id : [node_id, ...] }
+
+def write_adjacency(path, adjacency_list):
+    node_ids = list(adjacency_list.keys())
+    _write_ragged(path, node_ids, { 'nodes' : [sorted(adjacency_list[node_id]) for node_id in node_ids] }, _make_strings)
+
+def read_adjacency(path):
+    return RaggedTable(ColumnFile(path), ['nodes'])
+
+# Named lists of ids, e.g. the removed nodes and links of a cleanup step
+
+def write_id_lists(path, **lists):
+    _write_arrays(path, { name : _make_strings(ids) for name, ids in lists.items() })
+
+def read_id_lists(path):
+    data = ColumnFile(path)
+    return { name : _to_list(data[name]) for name in data.names }
+
+# Conversion of the legacy pickles
+
+def convert_legacy(path):
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+
+    name = os.path.basename(path)
+    target = os.path.splitext(path)[0] + '.npz'
+
+    if name == 'routes.dat':
+        write_routes(target, data)
+    elif name in ('stop_locations.dat', 'breakpoints.dat'):
+        write_locations(target, data)
+    elif name == 'stop_assignments.dat':
+        write_assignments(target, data)
+    elif name == 'adjacency_list.dat':
+        write_adjacency(target, data)
+    elif name == 'network_clean.dat':
+        removed_nodes, removed_links, detached_nodes, detached_links, duplicates = data
+        write_id_lists(target,
+            removed_nodes = removed_nodes, removed_links = removed_links,
+            detached_nodes = sorted(detached_nodes), detached_links = detached_links,
+            duplicate_links = [link.id for link in duplicates])
+    elif name == 'network_shrunk.dat':
+        outside_links, crossing_links, outside_nodes, moved_nodes = data[:4]
+        write_id_lists(target,
+            outside_links = [getattr(link, 'id', link) for link in outside_links],
+            clipped_links = [getattr(link, 'id', link) for link in crossing_links],
+            outside_nodes = sorted(outside_nodes), moved_nodes = moved_nodes,
+            created_nodes = data[4] if len(data) > 4 else [])
+    else:
+        raise RuntimeError('Unknown intermediate file %s' % path)
+
+    return target
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        print('%s -> %s' % (path, convert_legacy(path)))
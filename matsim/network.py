@@ -1,10 +1,60 @@
 from . import utils
-import xml.sax
+import xml.sax, xml.sax.saxutils, xml.parsers.expat
 import numpy as np
 import matplotlib.pyplot as plt
-import re
+import matplotlib.collections
+import re, os, heapq, hashlib, collections, multiprocessing, tempfile, zipfile
 import numpy.linalg as la
 
+# Number of point/link pairs evaluated at once by Network.snap_to_links
+SNAP_CHUNK_ELEMENTS = 2**22
+
+def _escape_attribute(value):
+    return xml.sax.saxutils.escape(value, { '"' : '&quot;' })
+
+def _make_box(minimum, maximum):
+    return np.array([
+        (minimum[0], minimum[1]), (maximum[0], minimum[1]),
+        (maximum[0], maximum[1]), (minimum[0], maximum[1])
+    ], dtype = np.float64)
+
+def _find_inside(points, polygon):
+    # Even-odd rule, points on the boundary of a box count as inside
+    points = np.asarray(points, dtype = np.float64).reshape((-1, 2))
+    minimum, maximum = np.min(polygon, axis = 0), np.max(polygon, axis = 0)
+
+    if len(polygon) == 4 and np.array_equal(polygon, _make_box(minimum, maximum)):
+        return ((points >= minimum) & (points <= maximum)).all(axis = 1)
+
+    x, y = points[:, 0], points[:, 1]
+    inside = np.zeros(len(points), dtype = bool)
+
+    for (ax, ay), (bx, by) in zip(polygon, np.roll(polygon, -1, axis = 0)):
+        if ay == by: continue
+        crosses = (ay > y) != (by > y)
+        inside ^= crosses & (x < ax + (y - ay) * (bx - ax) / (by - ay))
+
+    return inside
+
+def _intersect_polygon(starts, ends, polygon):
+    # Returns for every segment the parameters along the segment at which the
+    # boundary edges are crossed (NaN if an edge is not crossed)
+    corners = polygon
+    following = np.roll(polygon, -1, axis = 0)
+
+    direction = (ends - starts)[:, np.newaxis, :]
+    edges = (following - corners)[np.newaxis, :, :]
+    offset = corners[np.newaxis, :, :] - starts[:, np.newaxis, :]
+
+    denominator = direction[:, :, 0] * edges[:, :, 1] - direction[:, :, 1] * edges[:, :, 0]
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        t = (offset[:, :, 0] * edges[:, :, 1] - offset[:, :, 1] * edges[:, :, 0]) / denominator
+        s = (offset[:, :, 0] * direction[:, :, 1] - offset[:, :, 1] * direction[:, :, 0]) / denominator
+
+    valid = (denominator != 0.0) & (t >= 0.0) & (t <= 1.0) & (s >= 0.0) & (s <= 1.0)
+    return np.where(valid, t, np.nan)
+
 class Network:
     def __init__(self):
         self.path = None
@@ -14,12 +64,89 @@ class Network:
         self.links = {}
         self.nodes = {}
 
+        self._csr = None
+        self._csr_version = None
+        self._link_index = None
+        self._pairs = None
+        self._pair_count = 0
+
+        # Incremented on every change, cached structures remember the version
+        # they were built from
+        self._version = 0
+
+    def invalidate(self):
+        # Must be called whenever nodes or links are changed without the methods
+        # below, e.g. after assigning link.length, link.to_node_id or node.coords
+        # or after editing self.nodes and self.links directly
+        self._version += 1
+        self._csr = None
+        self._link_index = None
+        self._pairs = None
+
+    def to_csr(self):
+        # The count check only catches links and nodes that were put into the
+        # dictionaries directly, in-place edits rely on invalidate()
+        if self._csr is None or self._csr_version != self._version or len(self._csr.node_ids) != len(self.nodes) or len(self._csr.link_ids) != len(self.links):
+            self._csr = CSRNetwork(self)
+            self._csr_version = self._version
+
+        return self._csr
+
+    def get_link_index(self):
+        csr = self.to_csr()
+
+        if self._link_index is None or self._link_index.csr is not csr:
+            self._link_index = LinkIndex(self)
+
+        return self._link_index
+
+    def _get_pairs(self):
+        # Built on first lookup, the link count catches links that were put
+        # into self.links directly
+        if self._pairs is None or self._pair_count != len(self.links):
+            self._pairs = {}
+            self._pair_count = len(self.links)
+
+            for link in self.links.values():
+                pair = (link.from_node_id, link.to_node_id)
+
+                if pair not in self._pairs:
+                    self._pairs[pair] = []
+
+                self._pairs[pair].append(link)
+
+        return self._pairs
+
+    def add_node(self, node):
+        self.nodes[node.id] = node
+        self.invalidate()
+
+    def add_link(self, link):
+        self.links[link.id] = link
+        self.invalidate()
+
+    def remove_node(self, node_id):
+        del self.nodes[node_id]
+        self.invalidate()
+
+    def remove_link(self, link_id):
+        del self.links[link_id]
+        self.invalidate()
+
+    def get_connecting_links(self, from_node_id, to_node_id):
+        return self._get_pairs().get((from_node_id, to_node_id), [])
+
     def get_connecting_link(self, from_node_id, to_node_id):
-        for link in self.links.values():
-            if link.from_node_id == from_node_id and link.to_node_id == to_node_id:
-                return link
+        links = self.get_connecting_links(from_node_id, to_node_id)
+        return links[0] if len(links) > 0 else None
 
-        return None
+    def find_duplicate_links(self):
+        duplicates = []
+
+        for links in self._get_pairs().values():
+            duplicates += links[1:]
+
+        return duplicates
 
     def get_link_coords(self, link):
         start = self.nodes[link.from_node_id].coords
@@ -51,23 +178,106 @@ class Network:
             return start + difference * projection_length
 
     def find_closest_link(self, coords):
-        minimum_distance = np.inf
-        minimum_id = None
-
-        for link_id in sorted(self.links):
-            location = self.compute_closest_coords_on_link(coords, self.links[link_id])
-            distance = la.norm(location - coords)
+        return self.find_closest_links(coords, 1)[0]
 
-            if distance < minimum_distance:
-                minimum_distance = distance
-                minimum_id = link_id
+    def find_closest_links(self, coords, count):
+        return [self.links[link_id] for link_id in self.get_link_index().find_nearest(coords, count)]
 
-        return self.links[minimum_id]
+    def find_links_within(self, coords, radius):
+        return [self.links[link_id] for link_id in self.get_link_index().find_within(coords, radius)]
 
     def compute_distance_to_link(self, coords, link):
         closest = self.compute_closest_coords_on_link(coords, link)
         return la.norm(coords - closest)
 
+    def snap_to_links(self, points, chunk_size = None):
+        # Batch version of find_closest_link and compute_closest_coords_on_link
+        points = np.asarray(points, dtype = np.float64).reshape((-1, 2))
+        csr = self.to_csr()
+
+        if len(points) == 0:
+            return [], np.zeros((0, 2)), np.zeros(0)
+
+        if len(csr.link_ids) == 0:
+            raise RuntimeError('Cannot snap points to a network without links')
+
+        link_index = self.get_link_index()
+
+        # Candidates are ordered by link id so that ties resolve like in find_closest_link
+        ranks = np.zeros(len(csr.link_ids), dtype = np.int64)
+        ranks[sorted(range(len(csr.link_ids)), key = csr.link_ids.__getitem__)] = np.arange(len(csr.link_ids))
+
+        starts = csr.coords[csr.from_indices]
+        differences = csr.coords[csr.to_indices] - starts
+        squared_lengths = np.sqrt(np.sum(differences**2, axis = 1))**2
+        degenerate = squared_lengths == 0
+        squared_lengths[degenerate] = 1.0
+
+        indices = np.zeros(len(points), dtype = np.int64)
+        closest = np.zeros((len(points), 2))
+        distances = np.zeros(len(points))
+
+        # Points are grouped by grid cell and share the rings of candidate cells
+        centers = np.floor((points - link_index.origin) / link_index.cell_size).astype(np.int64)
+        unique_centers, inverse = np.unique(centers, axis = 0, return_inverse = True)
+        groups = np.split(np.argsort(inverse.flatten(), kind = 'stable'), np.cumsum(np.bincount(inverse.flatten()))[:-1])
+
+        for center, group in zip(unique_centers, groups):
+            # Rings closer than this do not overlap the grid
+            radius = max(int(np.max(np.maximum(-center, center - link_index.shape + 1))), 0)
+            candidates = set()
+
+            while True:
+                count = len(candidates)
+
+                for cell in link_index._get_ring(tuple(center), radius):
+                    candidates.update(link_index.cells.get(cell, ()))
+
+                covered = (center - radius <= 0).all() and (center + radius >= link_index.shape - 1).all()
+
+                if len(candidates) > count:
+                    selection = np.array(sorted(candidates, key = ranks.__getitem__), dtype = np.int64)
+                    group_chunk_size = chunk_size or max(1, SNAP_CHUNK_ELEMENTS // len(selection))
+
+                    for offset in range(0, len(group), group_chunk_size):
+                        chunk = group[offset:offset + group_chunk_size]
+
+                        dx = points[chunk, 0:1] - starts[selection, 0]
+                        dy = points[chunk, 1:2] - starts[selection, 1]
+
+                        projections = (dx * differences[selection, 0] + dy * differences[selection, 1]) / squared_lengths[selection]
+                        np.clip(projections, 0.0, 1.0, out = projections)
+
+                        # Same operation order as compute_distance_to_link to get identical ties
+                        dx = points[chunk, 0:1] - (starts[selection, 0] + differences[selection, 0] * projections)
+                        dy = points[chunk, 1:2] - (starts[selection, 1] + differences[selection, 1] * projections)
+
+                        chunk_distances = np.sqrt(dx * dx + dy * dy)
+                        chunk_distances[:, degenerate[selection]] = np.inf
+
+                        best = np.argmin(chunk_distances, axis = 1)
+                        rows = np.arange(len(chunk))
+                        best_indices = selection[best]
+
+                        indices[chunk] = best_indices
+                        closest[chunk] = starts[best_indices] + differences[best_indices] * projections[rows, best][:, np.newaxis]
+                        distances[chunk] = chunk_distances[rows, best]
+
+                if covered:
+                    break
+
+                # Links that have not been seen yet lie outside the covered block of cells
+                block_lower = link_index.origin + (center - radius) * link_index.cell_size
+                block_upper = link_index.origin + (center + radius + 1) * link_index.cell_size
+                gaps = np.minimum(np.min(points[group] - block_lower, axis = 1), np.min(block_upper - points[group], axis = 1))
+
+                if len(candidates) > 0 and np.all(distances[group] < gaps):
+                    break
+
+                radius += 1
+
+        return [csr.link_ids[index] for index in indices], closest, distances
+
     def filter_links(self, links):
         network = Network()
         network.name = self.name
@@ -75,30 +285,144 @@ class Network:
 
         for link_id in links:
             link = self.links[link_id]
-            network.links[link.id] = link
-            network.nodes[link.from_node_id] = self.nodes[link.from_node_id]
-            network.nodes[link.to_node_id] = self.nodes[link.to_node_id]
+            network.add_link(link)
+            network.add_node(self.nodes[link.from_node_id])
+            network.add_node(self.nodes[link.to_node_id])
 
         return network
 
     def filter(self, filter):
-        filtered_nodes = {}
-        filtered_links = {}
+        network = Network()
+        network.name = self.name
+        network.attributes = self.attributes
 
         for node_id, node in self.nodes.items():
-            if filter(node): filtered_nodes[node_id] = node
+            if filter(node): network.add_node(node)
 
         for link_id, link in self.links.items():
-            if link.from_node_id in filtered_nodes and link.to_node_id in filtered_nodes:
-                filtered_links[link_id] = link
+            if link.from_node_id in network.nodes and link.to_node_id in network.nodes:
+                network.add_link(link)
+
+        return network
+
+    def clip(self, boundary):
+        # The boundary is either a bounding box (minimum, maximum) or a polygon
+        # given as a sequence of corners. Returns the clipped network together
+        # with diagnostics. Links crossing the boundary end at the intersection
+        # point with the boundary.
+        polygon = np.asarray(boundary, dtype = np.float64)
+        if polygon.shape == (2, 2): polygon = _make_box(polygon[0], polygon[1])
+
+        csr = self.to_csr()
+        inside = _find_inside(csr.coords, polygon)
+
+        from_inside = inside[csr.from_indices]
+        to_inside = inside[csr.to_indices]
+
+        # Intersection parameters along all links that are not completely inside
+        candidates = np.flatnonzero(~(from_inside & to_inside))
+        starts = csr.coords[csr.from_indices[candidates]]
+        ends = csr.coords[csr.to_indices[candidates]]
+
+        parameters = _intersect_polygon(starts, ends, polygon)
+        first = np.min(np.where(np.isnan(parameters), np.inf, parameters), axis = 1)
+        last = np.max(np.where(np.isnan(parameters), -np.inf, parameters), axis = 1)
+
+        candidate_from_inside = from_inside[candidates]
+        candidate_to_inside = to_inside[candidates]
+
+        # Crossing links leave at the first and enter at the last intersection
+        lower = np.where(candidate_from_inside, 0.0, np.where(candidate_to_inside, last, first))
+        upper = np.where(candidate_to_inside, 1.0, np.where(candidate_from_inside, first, last))
+
+        crossing = (candidate_from_inside ^ candidate_to_inside) & np.isfinite(lower) & np.isfinite(upper)
+
+        # Links from outside to outside are kept if they pass through the area
+        passing = ~candidate_from_inside & ~candidate_to_inside & (lower < upper)
+        middle = 0.5 * (lower[passing] + upper[passing])
+        passing[passing] = _find_inside(starts[passing] + (ends[passing] - starts[passing]) * middle[:, np.newaxis], polygon)
+
+        selection = crossing | passing
+        clipped = candidates[selection]
+        lower, upper = lower[selection], upper[selection]
+        starts, ends = starts[selection], ends[selection]
+        is_from_clipped, is_to_clipped = ~candidate_from_inside[selection], ~candidate_to_inside[selection]
+
+        # Outside ends of the clipped links as (link, is start, node index, coordinates)
+        clipped_ends = []
+
+        for index, link_index in enumerate(clipped):
+            direction = ends[index] - starts[index]
+
+            if is_from_clipped[index]:
+                clipped_ends.append((index, True, csr.from_indices[link_index], starts[index] + direction * lower[index]))
+
+            if is_to_clipped[index]:
+                clipped_ends.append((index, False, csr.to_indices[link_index], starts[index] + direction * upper[index]))
+
+        # Ends of the same outside node at the same point (e.g. both directions
+        # of a road) share one node. The outside node itself is moved if all of
+        # its ends are at one point, otherwise new nodes are created.
+        points = collections.defaultdict(dict)
+
+        for index, is_start, node_index, coords in clipped_ends:
+            points[node_index].setdefault(tuple(np.round(coords, 6)), coords)
 
         network = Network()
-        network.nodes = filtered_nodes
-        network.links = filtered_links
         network.name = self.name
         network.attributes = self.attributes
 
-        return network
+        for index in np.flatnonzero(inside):
+            network.add_node(self.nodes[csr.node_ids[index]])
+
+        moved_nodes, created_nodes = [], []
+        end_node_ids = {}
+
+        for node_index, node_points in points.items():
+            node_id = csr.node_ids[node_index]
+
+            for number, (point, coords) in enumerate(node_points.items()):
+                if len(node_points) == 1:
+                    end_node_id = node_id
+                    moved_nodes.append(node_id)
+                else:
+                    end_node_id = '%s_clip%d' % (node_id, number + 1)
+                    created_nodes.append(end_node_id)
+
+                network.add_node(Node(end_node_id, coords))
+                end_node_ids[(node_index, point)] = end_node_id
+
+        replacements = {}
+
+        for index, link_index in enumerate(clipped):
+            link = self.links[csr.link_ids[link_index]]
+            replacements[link_index] = Link(link.id, link.from_node_id, link.to_node_id, link.length * (upper[index] - lower[index]), link.attributes)
+
+        for index, is_start, node_index, coords in clipped_ends:
+            node_id = end_node_ids[(node_index, tuple(np.round(coords, 6)))]
+            link = replacements[clipped[index]]
+
+            if is_start:
+                link.from_node_id = node_id
+            else:
+                link.to_node_id = node_id
+
+        kept = from_inside & to_inside
+        kept[clipped] = True
+
+        for index in np.flatnonzero(kept):
+            network.add_link(replacements[index] if index in replacements else self.links[csr.link_ids[index]])
+
+        diagnostics = {
+            'outside_nodes' : [csr.node_ids[index] for index in np.flatnonzero(~inside) if not csr.node_ids[index] in network.nodes],
+            'outside_links' : [csr.link_ids[index] for index in np.flatnonzero(~kept)],
+            'crossing_links' : [csr.link_ids[index] for index in candidates[crossing]],
+            'passing_links' : [csr.link_ids[index] for index in candidates[passing]],
+            'moved_nodes' : moved_nodes,
+            'created_nodes' : created_nodes
+        }
+
+        return network, diagnostics
 
 class Node:
     def __init__(self, id, coords):
@@ -113,13 +437,483 @@ class Link:
         self.length = float(length)
         self.attributes = attributes
 
+class CSRNetwork:
+    def __init__(self, network = None):
+        self.name = None
+        self.attributes = {}
+
+        if network is not None:
+            self.read_network(network)
+
+    def read_network(self, network):
+        self.name = network.name
+        self.attributes = network.attributes
+
+        node_ids = list(network.nodes.keys())
+        node_indices = { node_id : index for index, node_id in enumerate(node_ids) }
+
+        nodes = [network.nodes[node_id] for node_id in node_ids]
+        links = list(network.links.values())
+
+        coords = np.array([node.coords for node in nodes], dtype = np.float64).reshape((len(nodes), 2))
+        from_indices = [node_indices[link.from_node_id] for link in links]
+        to_indices = [node_indices[link.to_node_id] for link in links]
+
+        link_attributes = {}
+
+        for index, link in enumerate(links):
+            for key, value in link.attributes.items():
+                if key not in link_attributes: link_attributes[key] = [None] * len(links)
+                link_attributes[key][index] = value
+
+        self.set_arrays(node_ids, coords, [link.id for link in links], from_indices, to_indices, [link.length for link in links], link_attributes)
+
+    def set_arrays(self, node_ids, coords, link_ids, from_indices, to_indices, lengths, link_attributes):
+        # Link attributes are columns of strings with None for missing values
+        self.node_ids = list(node_ids)
+        self.node_indices = { node_id : index for index, node_id in enumerate(self.node_ids) }
+        self.link_ids = list(link_ids)
+        self.link_indices = { link_id : index for index, link_id in enumerate(self.link_ids) }
+
+        self.coords = np.asarray(coords, dtype = np.float64).reshape((len(self.node_ids), 2))
+
+        self.from_indices = np.asarray(from_indices, dtype = np.int64).reshape(len(self.link_ids))
+        self.to_indices = np.asarray(to_indices, dtype = np.int64).reshape(len(self.link_ids))
+
+        self.lengths = np.asarray(lengths, dtype = np.float64).reshape(len(self.link_ids))
+        self.link_attributes = link_attributes
+        self.freespeeds = self._get_float_attribute('freespeed')
+        self.capacities = self._get_float_attribute('capacity')
+
+        # Link indices grouped by start and end node
+        self.outgoing_offsets, self.outgoing_links = self._make_offsets(self.from_indices)
+        self.incoming_offsets, self.incoming_links = self._make_offsets(self.to_indices)
+
+    def _get_float_attribute(self, name):
+        values = self.link_attributes.get(name, [None] * len(self.link_ids))
+        return np.array([np.nan if value is None else float(value) for value in values], dtype = np.float64)
+
+    def to_network(self, network = None):
+        network = Network() if network is None else network
+        network.name = self.name
+        network.attributes = self.attributes
+
+        # Node coordinates are views on the coordinate array of this object
+        network.nodes = { node_id : Node(node_id, self.coords[index]) for index, node_id in enumerate(self.node_ids) }
+        network.links = {}
+
+        keys = list(self.link_attributes.keys())
+        rows = zip(*self.link_attributes.values()) if len(keys) > 0 else [()] * len(self.link_ids)
+        from_node_ids = [self.node_ids[index] for index in self.from_indices.tolist()]
+        to_node_ids = [self.node_ids[index] for index in self.to_indices.tolist()]
+
+        for link_id, from_node_id, to_node_id, length, row in zip(self.link_ids, from_node_ids, to_node_ids, self.lengths.tolist(), rows):
+            attributes = dict(zip(keys, row))
+            if None in row: attributes = { key : value for key, value in attributes.items() if value is not None }
+            network.links[link_id] = Link(link_id, from_node_id, to_node_id, length, attributes)
+
+        network.invalidate()
+        network._csr = self
+        network._csr_version = network._version
+
+        return network
+
+    def _make_offsets(self, indices):
+        order = np.argsort(indices, kind = 'stable')
+        counts = np.bincount(indices, minlength = len(self.node_ids))
+
+        offsets = np.zeros(len(self.node_ids) + 1, dtype = np.int64)
+        np.cumsum(counts, out = offsets[1:])
+
+        return offsets, order
+
+    def get_outgoing_links(self, node_index):
+        return self.outgoing_links[self.outgoing_offsets[node_index]:self.outgoing_offsets[node_index + 1]]
+
+    def get_incoming_links(self, node_index):
+        return self.incoming_links[self.incoming_offsets[node_index]:self.incoming_offsets[node_index + 1]]
+
+    def get_out_degrees(self):
+        return np.diff(self.outgoing_offsets)
+
+    def get_in_degrees(self):
+        return np.diff(self.incoming_offsets)
+
+class LinkIndex:
+    # Uniform grid over the link bounding boxes. Candidate links are ranked
+    # with Network.compute_distance_to_link and ties are broken by link id,
+    # which reproduces the former brute force search exactly.
+
+    def __init__(self, network, cell_size = None):
+        self.network = network
+        self.csr = network.to_csr()
+
+        starts = self.csr.coords[self.csr.from_indices]
+        ends = self.csr.coords[self.csr.to_indices]
+
+        lower = np.minimum(starts, ends)
+        upper = np.maximum(starts, ends)
+
+        if len(lower) == 0:
+            lower = upper = np.zeros((1, 2))
+
+        self.origin = np.min(lower, axis = 0)
+        extent = np.max(upper, axis = 0) - self.origin
+
+        if cell_size is None:
+            cell_size = max(np.mean(np.max(upper - lower, axis = 1)), np.sqrt(np.prod(extent) / len(lower)))
+
+        self.cell_size = cell_size if cell_size > 0 else 1.0
+        self.shape = (extent // self.cell_size).astype(np.int64) + 1
+
+        lower_cells = self._get_cells(lower)
+        upper_cells = self._get_cells(upper)
+
+        self.cells = {}
+
+        for link_index in range(len(self.csr.link_ids)):
+            for i in range(lower_cells[link_index, 0], upper_cells[link_index, 0] + 1):
+                for j in range(lower_cells[link_index, 1], upper_cells[link_index, 1] + 1):
+                    if (i, j) not in self.cells: self.cells[(i, j)] = []
+                    self.cells[(i, j)].append(link_index)
+
+    def _get_cells(self, coords):
+        cells = np.floor((np.asarray(coords) - self.origin) / self.cell_size).astype(np.int64)
+        return np.minimum(np.maximum(cells, 0), self.shape - 1)
+
+    def _get_ring(self, center, radius):
+        i0, j0 = center
+
+        if radius == 0:
+            yield center
+            return
+
+        rows = range(max(i0 - radius, 0), min(i0 + radius, self.shape[0] - 1) + 1)
+        columns = range(max(j0 - radius + 1, 0), min(j0 + radius - 1, self.shape[1] - 1) + 1)
+
+        for j in (j0 - radius, j0 + radius):
+            if 0 <= j < self.shape[1]:
+                for i in rows: yield (i, j)
+
+        for i in (i0 - radius, i0 + radius):
+            if 0 <= i < self.shape[0]:
+                for j in columns: yield (i, j)
+
+    def _rank(self, coords, link_indices):
+        ranking = []
+
+        for link_index in link_indices:
+            link = self.network.links[self.csr.link_ids[link_index]]
+            distance = self.network.compute_distance_to_link(coords, link)
+            if distance < np.inf: ranking.append((distance, link.id))
+
+        return sorted(ranking)
+
+    def find_nearest(self, coords, count = 1):
+        coords = np.asarray(coords, dtype = np.float64).flatten()
+        count = min(count, len(self.csr.link_ids))
+
+        if count == 0: return []
+
+        center = np.floor((coords - self.origin) / self.cell_size).astype(np.int64)
+
+        # Rings closer than this do not overlap the grid
+        radius = max(int(np.max(np.maximum(-center, center - self.shape + 1))), 0)
+        candidates = set()
+
+        while True:
+            for cell in self._get_ring(tuple(center), radius):
+                candidates.update(self.cells.get(cell, ()))
+
+            ranking = self._rank(coords, candidates)
+
+            # Links that have not been seen yet lie outside the covered block of cells
+            block_lower = self.origin + (center - radius) * self.cell_size
+            block_upper = self.origin + (center + radius + 1) * self.cell_size
+            gap = min(np.min(coords - block_lower), np.min(block_upper - coords))
+
+            covered = (center - radius <= 0).all() and (center + radius >= self.shape - 1).all()
+
+            if covered or (len(ranking) >= count and ranking[count - 1][0] < gap):
+                return [link_id for distance, link_id in ranking[:count]]
+
+            radius += 1
+
+    def find_within(self, coords, radius):
+        coords = np.asarray(coords, dtype = np.float64).flatten()
+
+        lower = self._get_cells(coords - radius)
+        upper = self._get_cells(coords + radius)
+
+        candidates = set()
+
+        for i in range(lower[0], upper[0] + 1):
+            for j in range(lower[1], upper[1] + 1):
+                candidates.update(self.cells.get((i, j), ()))
+
+        return [link_id for distance, link_id in self._rank(coords, candidates) if distance <= radius]
+
+def remove_sources_and_sinks(network):
+    # Repeatedly removes nodes without incoming or outgoing links together
+    # with their links. Degrees are updated incrementally, so every node and
+    # link is visited only once.
+    csr = network.to_csr()
+
+    out_degrees = csr.get_out_degrees().tolist()
+    in_degrees = csr.get_in_degrees().tolist()
+    from_indices = csr.from_indices.tolist()
+    to_indices = csr.to_indices.tolist()
+
+    removed_link_flags = [False] * len(csr.link_ids)
+
+    sinks = [index for index, degree in enumerate(out_degrees) if degree == 0]
+    sources = [index for index, degree in enumerate(in_degrees) if degree == 0 and out_degrees[index] > 0]
+    pending = collections.deque(sinks + sources)
+
+    queued = [False] * len(csr.node_ids)
+    for index in pending: queued[index] = True
+
+    removed_nodes = []
+    removed_links = []
+
+    while len(pending) > 0:
+        node_index = pending.popleft()
+        removed_nodes.append(csr.node_ids[node_index])
+
+        for link_index in csr.get_outgoing_links(node_index).tolist() + csr.get_incoming_links(node_index).tolist():
+            if removed_link_flags[link_index]: continue
+            removed_link_flags[link_index] = True
+            removed_links.append(csr.link_ids[link_index])
+
+            from_index, to_index = from_indices[link_index], to_indices[link_index]
+            out_degrees[from_index] -= 1
+            in_degrees[to_index] -= 1
+
+            for other in (from_index, to_index):
+                if not queued[other] and (out_degrees[other] == 0 or in_degrees[other] == 0):
+                    queued[other] = True
+                    pending.append(other)
+
+    for link_id in removed_links: network.remove_link(link_id)
+    for node_id in removed_nodes: network.remove_node(node_id)
+
+    return removed_nodes, removed_links
+
+def split_links(network, fractions, node_pattern = '%sb%d', link_pattern = '%sb%d'):
+    # Splits links at fractional positions given as { link id : fractions }.
+    # New nodes are numbered from 0 and new links from 1 along the link.
+    # Returns { link id : [new link ids in order along the link] }.
+    replacements = {}
+
+    for link_id, link_fractions in fractions.items():
+        link = network.links[link_id]
+        start, end = network.get_link_coords(link)
+
+        positions = start + (end - start) * np.sort(np.asarray(link_fractions, dtype = np.float64))[:, np.newaxis]
+
+        node_ids = [link.from_node_id] + [node_pattern % (link_id, i) for i in range(len(positions))] + [link.to_node_id]
+        coords = [start] + list(positions) + [end]
+
+        network.remove_link(link_id)
+
+        for i in range(len(positions)):
+            network.add_node(Node(node_ids[i + 1], positions[i]))
+
+        replacements[link_id] = []
+
+        for i in range(1, len(node_ids)):
+            part = Link(link_pattern % (link_id, i), node_ids[i - 1], node_ids[i], la.norm(coords[i - 1] - coords[i]), link.attributes)
+            network.add_link(part)
+            replacements[link_id].append(part.id)
+
+    return replacements
+
+def expand_links(link_ids, replacements):
+    # Link sequence of a route with all split links replaced by their parts
+    return [part for link_id in link_ids for part in replacements.get(link_id, (link_id,))]
+
+def find_strongly_connected_components(network):
+    # Iterative Tarjan algorithm on the CSR arrays. Returns a component label
+    # per node in the order of Network.to_csr().node_ids.
+    csr = network if isinstance(network, CSRNetwork) else network.to_csr()
+    count = len(csr.node_ids)
+
+    offsets = csr.outgoing_offsets.tolist()
+    outgoing = csr.outgoing_links.tolist()
+    to_indices = csr.to_indices.tolist()
+
+    order = [-1] * count
+    lowlink = [0] * count
+    on_stack = [False] * count
+    labels = [-1] * count
+
+    stack = []
+    counter = 0
+    component = 0
+
+    for root in range(count):
+        if order[root] >= 0: continue
+
+        order[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+
+        # Each entry holds a node and the position of its next outgoing link
+        work = [[root, offsets[root]]]
+
+        while len(work) > 0:
+            entry = work[-1]
+            node, position = entry
+
+            if position < offsets[node + 1]:
+                entry[1] += 1
+                destination = to_indices[outgoing[position]]
+
+                if order[destination] < 0:
+                    order[destination] = lowlink[destination] = counter
+                    counter += 1
+                    stack.append(destination)
+                    on_stack[destination] = True
+                    work.append([destination, offsets[destination]])
+
+                elif on_stack[destination] and order[destination] < lowlink[node]:
+                    lowlink[node] = order[destination]
+
+            else:
+                work.pop()
+
+                if len(work) > 0 and lowlink[node] < lowlink[work[-1][0]]:
+                    lowlink[work[-1][0]] = lowlink[node]
+
+                if lowlink[node] == order[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        labels[member] = component
+                        if member == node: break
+
+                    component += 1
+
+    return np.array(labels, dtype = np.int64)
+
+def find_largest_component(network):
+    # Node ids of the largest strongly connected component
+    csr = network.to_csr()
+    labels = find_strongly_connected_components(network)
+
+    if len(labels) == 0: return []
+
+    largest = np.argmax(np.bincount(labels))
+    return [csr.node_ids[index] for index in np.flatnonzero(labels == largest)]
+
+NETWORK_CACHE_VERSION = 1
+NETWORK_CACHE_SUFFIX = '.cache.npz'
+
+def _get_cache_key(path, verify_hash):
+    status = os.stat(path)
+    key = [str(NETWORK_CACHE_VERSION), str(status.st_size), str(status.st_mtime_ns)]
+
+    if verify_hash:
+        digest = hashlib.sha1()
+
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(2**20), b''):
+                digest.update(block)
+
+        key.append(digest.hexdigest())
+
+    return np.array(key)
+
+def _encode_strings(values):
+    return np.array([value.encode('utf-8') for value in values], dtype = bytes)
+
+def _decode_strings(values):
+    return [value.decode('utf-8') for value in values.tolist()]
+
+def _write_network_cache(path, key, csr):
+    arrays = {
+        'key' : key,
+        'name' : _encode_strings([] if csr.name is None else [csr.name]),
+        'attribute_keys' : _encode_strings(csr.attributes.keys()),
+        'attribute_values' : _encode_strings(csr.attributes.values()),
+        'node_ids' : _encode_strings(csr.node_ids),
+        'coords' : csr.coords,
+        'link_ids' : _encode_strings(csr.link_ids),
+        'from_indices' : csr.from_indices,
+        'to_indices' : csr.to_indices,
+        'lengths' : csr.lengths,
+        'columns' : _encode_strings(csr.link_attributes.keys())
+    }
+
+    # Attribute columns are stored as distinct values and codes (-1 if missing)
+    for index, column in enumerate(csr.link_attributes.values()):
+        values = sorted(set(value for value in column if value is not None))
+        codes = { value : code for code, value in enumerate(values) }
+
+        arrays['column_%d_values' % index] = _encode_strings(values)
+        arrays['column_%d_codes' % index] = np.array([-1 if value is None else codes[value] for value in column], dtype = np.int64)
+
+    # Concurrent writers (e.g. pipeline stages) each use their own temporary file
+    handle, temporary_path = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(path)), suffix = '.tmp')
+
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            np.savez(f, **arrays)
+
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+def _read_network_cache(path, key):
+    # Returns None if the cache is missing, outdated or unreadable
+    if not os.path.exists(path):
+        return None
+
+    try:
+        return _load_network_cache(path, key)
+    except (OSError, EOFError, KeyError, ValueError, IndexError, zipfile.BadZipFile):
+        return None
+
+def _load_network_cache(path, key):
+    with np.load(path) as data:
+        if data['key'].tolist() != key.tolist():
+            return None
+
+        csr = CSRNetwork()
+        csr.name = _decode_strings(data['name'])[0] if len(data['name']) > 0 else None
+        csr.attributes = dict(zip(_decode_strings(data['attribute_keys']), _decode_strings(data['attribute_values'])))
+
+        link_attributes = {}
+
+        for index, column in enumerate(_decode_strings(data['columns'])):
+            values = _decode_strings(data['column_%d_values' % index]) + [None]
+            link_attributes[column] = [values[code] for code in data['column_%d_codes' % index].tolist()]
+
+        csr.set_arrays(_decode_strings(data['node_ids']), data['coords'], _decode_strings(data['link_ids']), data['from_indices'], data['to_indices'], data['lengths'], link_attributes)
+
+    return csr
+
 class NetworkReader(xml.sax.ContentHandler):
     def __init__(self, network):
         self.network = network
         self.links = {}
         self.nodes = {}
 
-    def read(self, path):
+    def read(self, path, cache = False, verify_hash = False):
+        # With cache, a binary sidecar next to the source file is used while
+        # the size and modification time (and optionally hash) of the source match
+        if cache:
+            cache_path = path + NETWORK_CACHE_SUFFIX
+            cache_key = _get_cache_key(path, verify_hash)
+            csr = _read_network_cache(cache_path, cache_key)
+
+            if csr is not None:
+                csr.to_network(self.network)
+                self.network.path = path
+                return
+
         self.network.path = path
 
         self.links = {}
@@ -130,9 +924,13 @@ class NetworkReader(xml.sax.ContentHandler):
 
         self.network.links = self.links
         self.network.nodes = self.nodes
+        self.network.invalidate()
+
+        if cache:
+            _write_network_cache(cache_path, cache_key, self.network.to_csr())
 
     def _read_coords(self, attributes):
-        return np.array((attributes['x'], attributes['y'])).astype(np.float)
+        return np.array((attributes['x'], attributes['y'])).astype(np.float64)
 
     def _read_node(self, attributes):
         id = attributes['id']
@@ -165,14 +963,148 @@ class NetworkReader(xml.sax.ContentHandler):
             if 'name' in attributes:
                 self.network.name = attributes['name']
 
+class _InternedStrings(dict):
+    def __missing__(self, value):
+        self[value] = value
+        return value
+
+class FastNetworkReader:
+    # Expat based reader which collects nodes and links in flat lists. Repeated
+    # attribute values (modes, permlanes, ...) are interned.
+
+    def __init__(self, network = None):
+        self.network = network
+
+    def _parse(self, path, make_link):
+        node_ids, xs, ys, links = [], [], [], []
+        header = { 'name' : None, 'attributes' : {} }
+        strings = _InternedStrings()
+
+        def start(name, attributes):
+            # Attributes arrive as a flat [key, value, key, value, ...] list
+            if name == 'link':
+                if attributes[0:8:2] == ['id', 'from', 'to', 'length']:
+                    id, from_node_id, to_node_id, length = attributes[1:8:2]
+                    attributes = dict(zip(attributes[8::2], map(strings.__getitem__, attributes[9::2])))
+                else:
+                    attributes = dict(zip(attributes[::2], map(strings.__getitem__, attributes[1::2])))
+                    id, from_node_id, to_node_id, length = attributes.pop('id'), attributes.pop('from'), attributes.pop('to'), attributes.pop('length')
+
+                links.append(make_link(id, from_node_id, to_node_id, length, attributes))
+
+            elif name == 'node':
+                if attributes[0:6:2] == ['id', 'x', 'y']:
+                    id, x, y = attributes[1:6:2]
+                else:
+                    attributes = dict(zip(attributes[::2], attributes[1::2]))
+                    id, x, y = attributes['id'], attributes['x'], attributes['y']
+
+                node_ids.append(id)
+                xs.append(x)
+                ys.append(y)
+
+            elif name == 'links':
+                header['attributes'] = dict(zip(attributes[::2], attributes[1::2]))
+
+            elif name == 'network':
+                header['name'] = dict(zip(attributes[::2], attributes[1::2])).get('name')
+
+        parser = xml.parsers.expat.ParserCreate()
+        parser.buffer_text = True
+        parser.ordered_attributes = True
+        parser.StartElementHandler = start
+
+        with utils.open_by_extension(path, 'rb') as f:
+            parser.ParseFile(f)
+
+        coords = np.array((xs, ys), dtype = np.float64).T.copy()
+        return header, node_ids, coords, links
+
+    def read(self, path):
+        header, node_ids, coords, links = self._parse(path, Link)
+
+        self.network = Network() if self.network is None else self.network
+        self.network.path = path
+        self.network.name = header['name']
+        self.network.attributes = header['attributes']
+
+        # Node coordinates are views on one coordinate array
+        self.network.nodes = { node_id : Node(node_id, coords[index]) for index, node_id in enumerate(node_ids) }
+        self.network.links = { link.id : link for link in links }
+        self.network.invalidate()
+
+        return self.network
+
+    def read_arrays(self, path, cache = False, verify_hash = False):
+        # Uses the same binary sidecar as NetworkReader.read
+        if cache:
+            cache_path = path + NETWORK_CACHE_SUFFIX
+            cache_key = _get_cache_key(path, verify_hash)
+            csr = _read_network_cache(cache_path, cache_key)
+
+            if csr is not None: return csr
+
+        header, node_ids, coords, links = self._parse(path, lambda *link: link)
+        node_indices = { node_id : index for index, node_id in enumerate(node_ids) }
+
+        link_ids = [link[0] for link in links]
+        from_indices = [node_indices[link[1]] for link in links]
+        to_indices = [node_indices[link[2]] for link in links]
+        lengths = np.array([link[3] for link in links], dtype = np.float64)
+
+        link_attributes = {}
+
+        for index, link in enumerate(links):
+            for key, value in link[4].items():
+                if key not in link_attributes: link_attributes[key] = [None] * len(links)
+                link_attributes[key][index] = value
+
+        csr = CSRNetwork()
+        csr.name = header['name']
+        csr.attributes = header['attributes']
+        csr.set_arrays(node_ids, coords, link_ids, from_indices, to_indices, lengths, link_attributes)
+
+        if cache:
+            _write_network_cache(cache_path, cache_key, csr)
+
+        return csr
+
+# Link style keys that can be passed on to a LineCollection
+LINE_COLLECTION_STYLES = set(['color', 'linestyle', 'linewidth', 'alpha', 'zorder', 'label', 'antialiased', 'rasterized'])
+
+# Short and collection specific style names, replaced before styles are compared
+STYLE_ALIASES = {
+    'c' : 'color', 'colors' : 'color',
+    'ls' : 'linestyle', 'linestyles' : 'linestyle',
+    'lw' : 'linewidth', 'linewidths' : 'linewidth',
+    'aa' : 'antialiased', 'antialiaseds' : 'antialiased',
+    'mec' : 'markeredgecolor', 'mew' : 'markeredgewidth', 'mfc' : 'markerfacecolor', 'ms' : 'markersize'
+}
+
 class NetworkPlotter:
-    def __init__(self, network):
+    # In batched mode links with the same style are drawn as one LineCollection
+    # and nodes with the same style as one marker line. The style hooks and
+    # plot_link/plot_node overrides work the same in both modes. Batches and
+    # links that cannot be batched are added to the axes in the order in which
+    # their first element was plotted, so they stack like in unbatched mode.
+
+    def __init__(self, network, batched = False):
         self.network = network
+        self.batched = batched
         self.ax = None
 
+        self.link_batches = None
+        self.node_batches = None
+        self.draw_queue = None
+
     def plot(self, ax = None):
         self.ax = ax if ax is not None else plt.gca()
 
+        if self.batched:
+            self.link_batches = {}
+            self.node_batches = {}
+            self.draw_queue = []
+
         for node_id, node in self.network.nodes.items():
             self.plot_node(node)
 
@@ -181,6 +1113,39 @@ class NetworkPlotter:
             end = self.network.nodes[link.to_node_id].coords
             self.plot_link(link, start, end)
 
+        if self.batched:
+            self._draw_batches()
+
+    def _normalize_style(self, style):
+        return { STYLE_ALIASES.get(key, key) : value for key, value in style.items() }
+
+    def _add_to_batch(self, batches, kind, style, item):
+        key = repr(sorted(style.items()))
+
+        if not key in batches:
+            batches[key] = (style, [])
+            self.draw_queue.append((kind, batches[key]))
+
+        batches[key][1].append(item)
+
+    def _draw_batches(self):
+        for kind, entry in self.draw_queue:
+            if kind == 'nodes':
+                style, points = entry
+                points = np.array(points)
+                self.ax.plot(points[:, 0], points[:, 1], **dict(style, linestyle = 'none'))
+
+            elif kind == 'links':
+                style, segments = entry
+                self.ax.add_collection(matplotlib.collections.LineCollection(segments, **style))
+
+            else:
+                x, y, style = entry
+                self.ax.plot(x, y, **style)
+
+        self.ax.autoscale_view()
+        self.link_batches, self.node_batches, self.draw_queue = None, None, None
+
     def get_link_style(self, link):
         return { 'color' : 'k', 'linestyle' : '-' }
 
@@ -190,13 +1155,29 @@ class NetworkPlotter:
     def plot_link(self, link, start, end, style = None):
         style = self.get_link_style(link) if style is None else style
 
-        if style is not None:
+        if style is None:
+            return
+
+        if self.link_batches is None:
             self.ax.plot([start[0], end[0]], [start[1], end[1]], **style)
+            return
+
+        style = self._normalize_style(style)
+
+        if LINE_COLLECTION_STYLES.issuperset(style):
+            self._add_to_batch(self.link_batches, 'links', style, ((start[0], start[1]), (end[0], end[1])))
+        else:
+            self.draw_queue.append(('line', ([start[0], end[0]], [start[1], end[1]], style)))
 
     def plot_node(self, node):
         style = self.get_node_style(node)
 
-        if style is not None:
+        if style is None:
+            return
+
+        if self.node_batches is not None:
+            self._add_to_batch(self.node_batches, 'nodes', self._normalize_style(style), (node.coords[0], node.coords[1]))
+        else:
             self.ax.plot(node.coords[0], node.coords[1], **style)
 
 class NetworkTransformer:
@@ -233,119 +1214,506 @@ class NetworkTransformer:
     def insert_nodes(self):
         return ''
 
+class NetworkRewriter:
+    # Streaming counterpart to NetworkTransformer. The hooks receive the
+    # parsed attributes of each node and link and return the (modified)
+    # attributes or None to drop the element. Everything else is copied,
+    # including comments and processing instructions, with one exception:
+    # an internal DOCTYPE subset ([...] after the DTD reference) is dropped
+    # because expat does not report it verbatim.
+
+    def transform(self, source, target, compresslevel = 9):
+        with utils.BufferedWriter(target, compresslevel = compresslevel) as output:
+            self.output = output
+            self.pending = None
+            self.skipping = 0
+            self.depth = 0
+            self.finished = False
+
+            # Whitespace is held back so that inserted elements can be indented
+            self.whitespace = ''
+            self.indentation = '\n'
+
+            parser = xml.parsers.expat.ParserCreate()
+            parser.ordered_attributes = True
+            parser.buffer_text = True
+
+            parser.XmlDeclHandler = self._write_declaration
+            parser.StartDoctypeDeclHandler = self._write_doctype
+            parser.StartElementHandler = self._start_element
+            parser.EndElementHandler = self._end_element
+            parser.CharacterDataHandler = self._write_text
+            parser.CommentHandler = self._write_comment
+            parser.ProcessingInstructionHandler = self._write_processing_instruction
+
+            with utils.open_by_extension(source, 'rb') as f:
+                parser.ParseFile(f)
+
+            self._close_pending()
+            self._flush_whitespace()
+            output.write('\n')
+
+    def transform_link(self, id, attributes):
+        return attributes
+
+    def transform_node(self, id, attributes):
+        return attributes
+
+    def insert_links(self):
+        return []
+
+    def insert_nodes(self):
+        return []
+
+    def _render_element(self, name, attributes, close = False):
+        rendered = ''.join([' %s="%s"' % (key, _escape_attribute(str(value))) for key, value in attributes.items()])
+        return '<%s%s%s>' % (name, rendered, ' /' if close else '')
+
+    def _close_pending(self):
+        if self.pending is not None:
+            self.output.write(self._render_element(*self.pending))
+            self.pending = None
+
+    def _flush_whitespace(self):
+        self.output.write(self.whitespace)
+        self.whitespace = ''
+
+    def _write_declaration(self, version, encoding, standalone):
+        standalone = '' if standalone == -1 else ' standalone="%s"' % ('yes' if standalone == 1 else 'no')
+        self.output.write('<?xml version="%s" encoding="%s"%s?>\n' % (version, encoding or 'UTF-8', standalone))
+
+    def _write_doctype(self, name, system_id, public_id, has_internal_subset):
+        if public_id is not None:
+            self.output.write('<!DOCTYPE %s PUBLIC "%s" "%s">\n' % (name, public_id, system_id))
+        elif system_id is not None:
+            self.output.write('<!DOCTYPE %s SYSTEM "%s">\n' % (name, system_id))
+
+    def _write_text(self, text):
+        if self.skipping > 0: return
+        self._close_pending()
+
+        if text.isspace():
+            self.whitespace += text
+        else:
+            self._flush_whitespace()
+            self.output.write(xml.sax.saxutils.escape(text))
+
+    def _write_markup(self, markup):
+        if self.skipping > 0: return
+        self._close_pending()
+        self._flush_whitespace()
+
+        # Whitespace outside of the root element is not reported
+        if self.depth > 0:
+            self.output.write(markup)
+        elif self.finished:
+            self.output.write('\n' + markup)
+        else:
+            self.output.write(markup + '\n')
+
+    def _write_comment(self, text):
+        self._write_markup('<!--%s-->' % text)
+
+    def _write_processing_instruction(self, target, data):
+        self._write_markup('<?%s %s?>' % (target, data) if data else '<?%s?>' % target)
+
+    def _start_element(self, name, attributes):
+        self.depth += 1
+
+        if self.skipping > 0:
+            self.skipping += 1
+            return
+
+        self._close_pending()
+        attributes = dict(zip(attributes[::2], attributes[1::2]))
+
+        if len(self.whitespace) > 0: self.indentation = self.whitespace
+
+        if name == 'node':
+            attributes = self.transform_node(attributes['id'], attributes)
+        elif name == 'link':
+            attributes = self.transform_link(attributes['id'], attributes)
+
+        if attributes is None:
+            self.whitespace = ''
+            self.skipping = 1
+        else:
+            self._flush_whitespace()
+            self.pending = (name, attributes)
+
+    def _end_element(self, name):
+        self.depth -= 1
+        self.finished = self.depth == 0
+
+        if self.skipping > 0:
+            self.skipping -= 1
+            return
+
+        if name == 'nodes':
+            self._insert('node', self.insert_nodes())
+        elif name == 'links':
+            self._insert('link', self.insert_links())
+
+        if self.pending is not None:
+            self.output.write(self._render_element(self.pending[0], self.pending[1], True))
+            self.pending = None
+        else:
+            self._flush_whitespace()
+            self.output.write('</%s>' % name)
+
+    def _insert(self, name, elements):
+        for attributes in elements:
+            self._close_pending()
+            self.output.write(self.indentation + self._render_element(name, attributes, True))
+
 class DijkstraCache:
     def __init__(self, network):
-        self.adjacency_list = network.make_adjacency_list()
         self.network = network
 
-        self.outgoing = { node_id : set() for node_id in network.nodes.keys() }
-        self.incoming = { node_id : set() for node_id in network.nodes.keys() }
+        # Integer representation of the graph for the routing engine
+        self.csr = network.to_csr()
+
+        self.node_ids = self.csr.node_ids
+        self.node_indices = self.csr.node_indices
+        self.link_ids = self.csr.link_ids
 
-        for link in network.links.values():
-            self.outgoing[link.from_node_id].add(link.id)
-            self.incoming[link.to_node_id].add(link.id)
+        self.link_from = self.csr.from_indices.tolist()
+        self.link_to = self.csr.to_indices.tolist()
+
+        self.neighbours = self._make_neighbours(self.csr.outgoing_offsets, self.csr.outgoing_links, self.link_to)
+        self.reverse_neighbours = None
+
+    def _make_neighbours(self, offsets, links, destinations):
+        offsets = offsets.tolist()
+        links = links.tolist()
+
+        return [
+            [(destinations[link_index], link_index) for link_index in links[offsets[index]:offsets[index + 1]]]
+            for index in range(len(self.node_ids))
+        ]
+
+    def get_reverse_neighbours(self):
+        if self.reverse_neighbours is None:
+            self.reverse_neighbours = self._make_neighbours(self.csr.incoming_offsets, self.csr.incoming_links, self.link_from)
+
+        return self.reverse_neighbours
 
     def get_connecting_link_id(self, from_node_id, to_node_id):
-        outgoing = self.outgoing[from_node_id]
-        incoming = self.incoming[to_node_id]
-        hits = set(outgoing).intersection(set(incoming))
+        hits = self.network.get_connecting_links(from_node_id, to_node_id)
 
         if len(hits) == 1:
-            return hits.pop()
+            return hits[0].id
         elif len(hits) == 0:
             return None
         else:
-            raise RuntimeError('Network contains duplicate links: ' + repr(hits))
+            raise RuntimeError('Network contains duplicate links: ' + repr(set(link.id for link in hits)))
 
 class Dijkstra:
     def __init__(self, network, cache = None):
         self.cache = cache if cache is not None else DijkstraCache(network)
         self.network = network
+        self.costs = None
+        self.cost_list = None
 
     def compute_cost(self, link):
         return 1
 
-    def find_route(self, from_node_id, to_node_id):
+    def get_costs(self):
+        # Link costs are evaluated once per instance, in the order of the cache
+        if self.costs is None:
+            links = self.network.links
+            self.costs = np.array([self.compute_cost(links[link_id]) for link_id in self.cache.link_ids], dtype = np.float64)
+            self.cost_list = self.costs.tolist()
+
+        return self.costs
+
+    def _search(self, source, targets = None, reverse = False, estimate = None):
         # Prepare data structures
-        node_map = list(self.network.nodes.keys())
+        self.get_costs()
+        costs = self.cost_list
+        neighbours = self.cache.get_reverse_neighbours() if reverse else self.cache.neighbours
 
-        distances = np.array([np.inf] * len(node_map))
-        previous = [None] * len(node_map)
+        distances = { source : 0.0 }
+        previous = {}
+        settled = set()
 
-        pending = list(range(len(node_map)))
+        # Estimates are only computed for nodes that are reached
+        estimates = {}
 
-        distances[node_map.index(from_node_id)] = 0
-        target = node_map.index(to_node_id)
+        pending = None if targets is None else set(targets)
+        queue = [(0.0, 0.0, source)]
 
-        # Traverse the network
-        while len(pending) > 0:
-            current = pending[np.argmin(distances[pending])]
-            pending.remove(current)
+        # Traverse the network, ordered by distance plus estimate if given
+        while len(queue) > 0:
+            priority, distance, current = heapq.heappop(queue)
 
-            if current == target: break
+            if current in settled: continue
+            settled.add(current)
 
-            for destination in self.cache.adjacency_list[node_map[current]]:
-                destination = node_map.index(destination)
+            if pending is not None:
+                pending.discard(current)
+                if len(pending) == 0: break
 
-                link_id = self.cache.get_connecting_link_id(node_map[current], node_map[destination])
-                proposal = distances[current] + self.compute_cost(self.network.links[link_id])
+            for destination, link_index in neighbours[current]:
+                proposal = distance + costs[link_index]
 
-                if proposal < distances[destination]:
+                if proposal < distances.get(destination, np.inf):
                     distances[destination] = proposal
-                    previous[destination] = current
+                    previous[destination] = link_index
+
+                    if estimate is None:
+                        priority = proposal
+                    else:
+                        if not destination in estimates: estimates[destination] = estimate(destination)
+                        priority = proposal + estimates[destination]
+
+                    heapq.heappush(queue, (priority, proposal, destination))
 
-        # Build route in indices
+        return distances, previous
+
+    def _build_route(self, previous, target):
+        # Build route in link indices
         route = []
         current = target
 
-        while previous[current] is not None:
-            route.append(current)
-            current = previous[current]
+        while current in previous:
+            route.append(previous[current])
+            current = self.cache.link_from[previous[current]]
 
-        route.append(current)
         route = list(reversed(route))
 
-        # Get node IDs
-        nodes = [node_map[index] for index in route]
+        # Get node and link IDs
+        nodes = [self.cache.node_ids[current]]
+        nodes += [self.cache.node_ids[self.cache.link_to[index]] for index in route]
+        links = [self.cache.link_ids[index] for index in route]
+
+        return nodes, links
+
+    def find_route(self, from_node_id, to_node_id, heuristic = None):
+        source = self.cache.node_indices[from_node_id]
+        target = self.cache.node_indices[to_node_id]
+
+        estimate = None if heuristic is None else heuristic.get_estimator(target)
+        distances, previous = self._search(source, (target,), estimate = estimate)
+        nodes, links = self._build_route(previous, target)
+
+        return nodes, links, distances.get(target, np.inf)
+
+    def find_costs(self, from_node_id, to_node_ids = None, predecessors = False, reverse = False):
+        # With reverse, costs are computed towards from_node_id instead
+        source = self.cache.node_indices[from_node_id]
+        targets = None if to_node_ids is None else [self.cache.node_indices[node_id] for node_id in to_node_ids]
+
+        distances, previous = self._search(source, targets, reverse)
+
+        if targets is None:
+            costs = np.full(len(self.cache.node_ids), np.inf)
+            costs[list(distances.keys())] = list(distances.values())
+        else:
+            costs = np.array([distances.get(target, np.inf) for target in targets], dtype = np.float64)
+
+        if predecessors:
+            links = np.full(len(self.cache.node_ids), -1, dtype = np.int64)
+            links[list(previous.keys())] = list(previous.values())
+            return costs, links
+
+        return costs
+
+    def find_route_from_predecessors(self, predecessors, to_node_id):
+        # Predecessors are link indices into cache.link_ids as returned by find_costs
+        target = self.cache.node_indices[to_node_id]
+        previous = {}
+        current = target
+
+        while predecessors[current] >= 0:
+            previous[current] = int(predecessors[current])
+            current = self.cache.link_from[previous[current]]
+
+        return self._build_route(previous, target)
+
+    def find_cost_matrix(self, from_node_ids, to_node_ids = None, predecessors = False, processes = None, path = None, predecessors_path = None):
+        # Rows are origins, columns the given destinations (or all nodes in cache order)
+        from_node_ids = list(from_node_ids)
+        to_node_ids = None if to_node_ids is None else list(to_node_ids)
+        columns = len(self.cache.node_ids) if to_node_ids is None else len(to_node_ids)
+
+        shape = (len(from_node_ids), columns)
+        predecessor_shape = (len(from_node_ids), len(self.cache.node_ids))
+
+        if path is None:
+            matrix = np.zeros(shape)
+        else:
+            matrix = np.lib.format.open_memmap(path, mode = 'w+', dtype = np.float64, shape = shape)
+
+        links = None
+
+        if predecessors and predecessors_path is None:
+            links = np.zeros(predecessor_shape, dtype = np.int64)
+        elif predecessors:
+            links = np.lib.format.open_memmap(predecessors_path, mode = 'w+', dtype = np.int64, shape = predecessor_shape)
+
+        self.get_costs()
+        tasks = [(index, from_node_id, to_node_ids, predecessors) for index, from_node_id in enumerate(from_node_ids)]
+
+        if processes is None or processes == 1:
+            rows = map(_find_matrix_row, ((self,) + task for task in tasks))
+            self._fill_matrix(rows, matrix, links)
+        else:
+            with multiprocessing.Pool(processes, initializer = _set_matrix_dijkstra, initargs = (self,)) as pool:
+                chunksize = max(1, len(tasks) // (4 * processes))
+                rows = pool.imap_unordered(_find_matrix_row, ((None,) + task for task in tasks), chunksize)
+                self._fill_matrix(rows, matrix, links)
+
+        if isinstance(matrix, np.memmap): matrix.flush()
+        if isinstance(links, np.memmap): links.flush()
+
+        return (matrix, links) if predecessors else matrix
+
+    def _fill_matrix(self, rows, matrix, links):
+        for index, row in rows:
+            if links is None:
+                matrix[index] = row
+            else:
+                matrix[index], links[index] = row
+
+class EuclideanHeuristic:
+    # The smallest ratio of link cost to straight line link length bounds the
+    # cost of any path from below, e.g. 1 / maximum speed for travel times.
+
+    def __init__(self, dijkstra):
+        csr = dijkstra.cache.csr
+        costs = dijkstra.get_costs()
+
+        distances = la.norm(csr.coords[csr.to_indices] - csr.coords[csr.from_indices], axis = 1)
+        valid = distances > 0
+
+        self.factor = max(np.min(costs[valid] / distances[valid]), 0.0) if valid.any() else 0.0
+        self.factor *= 1.0 - 1e-9 # Guard against rounding
+        self.x = csr.coords[:, 0].tolist()
+        self.y = csr.coords[:, 1].tolist()
+
+    def get_estimator(self, target):
+        # Returns a function that bounds the cost from a node index to the target
+        x, y, factor = self.x, self.y, self.factor
+        target_x, target_y = x[target], y[target]
 
-        # Get links IDs
-        links = [self.cache.get_connecting_link_id(nodes[i-1], nodes[i]) for i in range(1, len(nodes))]
+        def estimate(node):
+            dx, dy = x[node] - target_x, y[node] - target_y
+            return factor * (dx * dx + dy * dy)**0.5
 
-        return nodes, links, distances[target]
+        return estimate
+
+class LandmarkHeuristic:
+    # ALT lower bounds from the triangle inequality with precomputed costs
+    # from and to a set of landmark nodes.
+
+    def __init__(self, dijkstra, landmarks = 8):
+        self.dijkstra = dijkstra
+
+        if isinstance(landmarks, int):
+            landmarks = self._select_landmarks(landmarks)
+
+        self.landmarks = list(landmarks)
+        self.forward = np.array([dijkstra.find_costs(node_id) for node_id in self.landmarks]).reshape((-1, len(dijkstra.cache.node_ids)))
+        self.backward = np.array([dijkstra.find_costs(node_id, reverse = True) for node_id in self.landmarks]).reshape(self.forward.shape)
+
+        self.forward_lists = self.forward.tolist()
+        self.backward_lists = self.backward.tolist()
+
+    def _select_landmarks(self, count):
+        # Farthest-first selection, starting from the first node
+        node_ids = self.dijkstra.cache.node_ids
+        count = min(count, len(node_ids))
+
+        if count == 0: return []
+
+        landmarks = []
+        closest = self.dijkstra.find_costs(node_ids[0])
+
+        for iteration in range(count):
+            candidates = np.where(np.isfinite(closest), closest, -1.0)
+            candidates[[self.dijkstra.cache.node_indices[node_id] for node_id in landmarks]] = -np.inf
+
+            landmarks.append(node_ids[np.argmax(candidates)])
+            closest = self.dijkstra.find_costs(landmarks[-1]) if iteration == 0 else np.minimum(closest, self.dijkstra.find_costs(landmarks[-1]))
+
+        return landmarks
+
+    def get_estimator(self, target):
+        # Returns a function that bounds the cost from a node index to the target.
+        # Unreachable combinations give inf - inf = nan, which never wins the
+        # comparison, while an infinite bound marks nodes without a path.
+        rows = [
+            (forward, backward, forward[target], backward[target])
+            for forward, backward in zip(self.forward_lists, self.backward_lists)
+        ]
+
+        def estimate(node):
+            best = 0.0
+
+            for forward, backward, forward_target, backward_target in rows:
+                bound = forward_target - forward[node]
+                if bound > best: best = bound
+
+                bound = backward[node] - backward_target
+                if bound > best: best = bound
+
+            return best
+
+        return estimate
+
+_matrix_dijkstra = None
+
+def _set_matrix_dijkstra(dijkstra):
+    global _matrix_dijkstra
+    _matrix_dijkstra = dijkstra
+
+def _find_matrix_row(task):
+    dijkstra, index, from_node_id, to_node_ids, predecessors = task
+    dijkstra = _matrix_dijkstra if dijkstra is None else dijkstra
+    return index, dijkstra.find_costs(from_node_id, to_node_ids, predecessors)
 
 class NetworkWriter:
     def __init__(self, network):
         self.network = network
+        self.rendered = {}
 
     def _write_nodes(self, f):
         f.write('    <nodes>\n')
 
         for node in self.network.nodes.values():
-            f.write('        ' + '<node id="%s" x="%f" y="%f" />\n' % (node.id, node.coords[0], node.coords[1]))
+            f.write('        <node id="%s" x="%f" y="%f" />\n' % (node.id, node.coords[0], node.coords[1]))
 
         f.write('    </nodes>\n')
 
     def _render_attributes(self, attributes):
-        values = attributes.values()
-        keys = attributes.keys()
-        return ' '.join(['%s="%s"' % (key, value) for key, value in zip(keys, values)])
+        # Most links share the same attributes, so renderings are reused
+        items = tuple(attributes.items())
+
+        if items not in self.rendered:
+            self.rendered[items] = ' '.join(['%s="%s"' % item for item in items])
+
+        return self.rendered[items]
 
     def _write_links(self, f):
         f.write('    <links %s>\n' % self._render_attributes(self.network.attributes))
 
         for link in self.network.links.values():
             args = (link.id, link.from_node_id, link.to_node_id, link.length, self._render_attributes(link.attributes))
-            f.write('        ' + '<link id="%s" from="%s" to="%s" length="%f" %s />\n' % args)
+            f.write('        <link id="%s" from="%s" to="%s" length="%f" %s />\n' % args)
 
         f.write('    </links>\n')
 
-    def write(self, path):
-        with utils.open_by_extension(path, 'w+') as f:
+    def write(self, path, compresslevel = 9, threads = None):
+        # Returns the statistics of utils.BufferedWriter
+        with utils.BufferedWriter(path, compresslevel = compresslevel, threads = threads) as f:
             f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
             f.write('<!DOCTYPE network SYSTEM "http://www.matsim.org/files/dtd/network_v1.dtd">\n')
-            f.write('<network name="%s">\n' % self.network.name)
+            f.write('<network name="%s">\n' % self.network.name if self.network.name is not None else '<network>\n')
 
             self._write_nodes(f)
             self._write_links(f)
 
             f.write('</network>')
+
+        return f.get_statistics()
@@ -0,0 +1,208 @@
+"""
+    Runs scripts as stages of a pipeline. Every stage declares the files it
+    reads and writes. The content hashes of the script, its inputs and the code
+    it imports (by default all modules of the matsim package) are kept in a
+    state file and a stage is only executed again if one of them changed or an
+    output is missing or has been modified. Stages that do not depend on
+    each other run concurrently, interactive stages run on their own.
+"""
+
+import concurrent.futures
+import subprocess, hashlib, json, glob, os, sys, time
+
+PIPELINE_STATE_VERSION = 1
+
+class Stage:
+    def __init__(self, script, inputs = [], outputs = [], interactive = False):
+        self.name = os.path.splitext(os.path.basename(script))[0]
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.interactive = interactive
+
+def hash_file(path, block_size = 2**20):
+    digest = hashlib.sha1()
+
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+class Pipeline:
+    def __init__(self, stages, state_path = '.pipeline.json', code = None):
+        self.stages = list(stages)
+        self.state_path = state_path
+        self.state = self._read_state()
+
+        # Source files every stage depends on
+        if code is None:
+            code = [os.path.relpath(path) for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py')))]
+
+        self.code = list(code)
+
+        # A stage depends on all stages that write one of its inputs
+        producers = {}
+
+        for stage in self.stages:
+            for path in stage.outputs:
+                if path in producers:
+                    raise RuntimeError('%s is written by %s and %s' % (path, producers[path], stage.name))
+
+                producers[path] = stage.name
+
+        self.dependencies = {
+            stage.name : set(producers[path] for path in stage.inputs if path in producers)
+            for stage in self.stages
+        }
+
+    def _read_state(self):
+        if not os.path.exists(self.state_path): return {}
+
+        with open(self.state_path) as f:
+            state = json.load(f)
+
+        return state['stages'] if state.get('version') == PIPELINE_STATE_VERSION else {}
+
+    def _write_state(self):
+        temporary_path = self.state_path + '.tmp'
+
+        with open(temporary_path, 'w+') as f:
+            json.dump({ 'version' : PIPELINE_STATE_VERSION, 'stages' : self.state }, f, indent = 4, sort_keys = True)
+
+        os.replace(temporary_path, self.state_path)
+
+    def get_fingerprint(self, stage):
+        fingerprint = {}
+
+        for path in [stage.script] + stage.inputs + self.code:
+            if not os.path.exists(path):
+                raise RuntimeError('Input %s of stage %s does not exist' % (path, stage.name))
+
+            fingerprint[path] = hash_file(path)
+
+        return fingerprint
+
+    def is_up_to_date(self, stage, fingerprint):
+        state = self.state.get(stage.name)
+        if state is None or state['inputs'] != fingerprint: return False
+
+        for path in stage.outputs:
+            if not os.path.exists(path) or hash_file(path) != state['outputs'].get(path):
+                return False
+
+        return True
+
+    def get_stages(self, names = None):
+        # Selected stages and everything they depend on, in declaration order
+        if names is None: return list(self.stages)
+
+        # Script names are accepted as well
+        known = set(stage.name for stage in self.stages)
+        pending = [os.path.splitext(os.path.basename(name))[0] for name in names]
+        selected = set()
+
+        while len(pending) > 0:
+            name = pending.pop()
+
+            if not name in known:
+                raise RuntimeError('Unknown stage %s' % name)
+
+            if not name in selected:
+                selected.add(name)
+                pending += self.dependencies[name]
+
+        return [stage for stage in self.stages if stage.name in selected]
+
+    def _execute(self, stage):
+        start = time.time()
+
+        if stage.interactive:
+            result = subprocess.run([sys.executable, stage.script])
+            output = ''
+        else:
+            result = subprocess.run([sys.executable, stage.script], stdout = subprocess.PIPE, stderr = subprocess.STDOUT, universal_newlines = True)
+            output = result.stdout
+
+        return result.returncode, output, time.time() - start
+
+    def _finish(self, stage, fingerprint, returncode, output, seconds):
+        for line in output.splitlines():
+            print('[%s] %s' % (stage.name, line))
+
+        missing = [path for path in stage.outputs if not os.path.exists(path)]
+
+        if returncode != 0 or len(missing) > 0:
+            if len(missing) > 0: print('[%s] Missing outputs: %s' % (stage.name, ', '.join(missing)))
+            print('[%s] Failed after %.2fs' % (stage.name, seconds))
+
+            self.state.pop(stage.name, None)
+            self._write_state()
+            return 'failed'
+
+        self.state[stage.name] = {
+            'inputs' : fingerprint,
+            'outputs' : { path : hash_file(path) for path in stage.outputs }
+        }
+
+        self._write_state()
+        print('[%s] Finished in %.2fs' % (stage.name, seconds))
+        return 'finished'
+
+    def run(self, names = None, force = False, threads = None):
+        # Returns the status of every selected stage: finished, skipped,
+        # failed or blocked (a dependency failed)
+        stages = self.get_stages(names)
+        status = {}
+        running = {}
+
+        with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+            while len(status) < len(stages):
+                progress = len(status)
+
+                for stage in stages:
+                    if stage.name in status or stage.name in [item[0].name for item in running.values()]: continue
+
+                    dependencies = [status.get(name) for name in self.dependencies[stage.name]]
+
+                    if 'failed' in dependencies or 'blocked' in dependencies:
+                        print('[%s] Blocked by a failed dependency' % stage.name)
+                        status[stage.name] = 'blocked'
+                        continue
+
+                    if not all(dependency in ('finished', 'skipped') for dependency in dependencies):
+                        continue
+
+                    try:
+                        fingerprint = self.get_fingerprint(stage)
+                    except RuntimeError as error:
+                        print('[%s] %s' % (stage.name, error))
+                        status[stage.name] = 'failed'
+                        continue
+
+                    if not force and self.is_up_to_date(stage, fingerprint):
+                        print('[%s] Up to date' % stage.name)
+                        status[stage.name] = 'skipped'
+                        continue
+
+                    if stage.interactive:
+                        # Interactive stages need the terminal for themselves
+                        if len(running) > 0: continue
+
+                        print('[%s] Running interactively' % stage.name)
+                        status[stage.name] = self._finish(stage, fingerprint, *self._execute(stage))
+                    else:
+                        print('[%s] Running' % stage.name)
+                        running[executor.submit(self._execute, stage)] = (stage, fingerprint)
+
+                if len(running) == 0 and len(status) == progress:
+                    raise RuntimeError('Stages have cyclic dependencies')
+
+                if len(running) > 0:
+                    done, pending = concurrent.futures.wait(running, return_when = concurrent.futures.FIRST_COMPLETED)
+
+                    for future in done:
+                        stage, fingerprint = running.pop(future)
+                        status[stage.name] = self._finish(stage, fingerprint, *future.result())
+
+        return status
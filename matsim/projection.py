@@ -0,0 +1,41 @@
+"""
+    Vectorized reprojection of network nodes, transit stop facilities and
+    facilities. All coordinates of an object are collected in one array and
+    transformed with a single pyproj call. Projections are given as strings
+    such as 'EPSG:26914'.
+"""
+
+import numpy as np
+
+def reproject_coords(coords, source, target):
+    import pyproj
+
+    coords = np.asarray(coords, dtype = np.float64).reshape((-1, 2))
+
+    if hasattr(pyproj, 'Transformer'):
+        transformer = pyproj.Transformer.from_crs(source, target, always_xy = True)
+        x, y = transformer.transform(coords[:, 0], coords[:, 1])
+    else:
+        x, y = pyproj.transform(pyproj.Proj(init = source), pyproj.Proj(init = target), coords[:, 0], coords[:, 1])
+
+    return np.column_stack((x, y))
+
+def _reproject_objects(objects, source, target):
+    objects = list(objects)
+
+    if len(objects) > 0:
+        coords = reproject_coords([item.coords for item in objects], source, target)
+
+        for index, item in enumerate(objects):
+            item.coords = coords[index]
+
+def reproject_network(network, source, target):
+    _reproject_objects(network.nodes.values(), source, target)
+    network.invalidate()
+
+def reproject_schedule(schedule, source, target):
+    _reproject_objects(schedule.stop_facilities.values(), source, target)
+
+def reproject_facilities(facilities, source, target):
+    # Facilities as returned by FacilitiesReader.read
+    _reproject_objects(facilities.values(), source, target)
@@ -0,0 +1,214 @@
+"""
+    Level of detail rendering for large networks. Links are joined into
+    undirected polylines between junctions, simplified with the
+    Douglas-Peucker algorithm to the pixel size and dropped entirely if they
+    are smaller than a pixel. plot_background draws the result as one
+    rasterized collection, so highlighted elements on top stay vector graphics
+    in PDF output. export_tiles renders map tiles in parallel.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.collections, matplotlib.figure
+import matplotlib.backends.backend_agg
+import os, multiprocessing
+
+def find_polylines(network):
+    # Node index sequences of chains between nodes that do not have exactly
+    # two neighbours. Both directions of a road are joined into one chain.
+    csr = network.to_csr()
+
+    pairs = np.sort(np.column_stack((csr.from_indices, csr.to_indices)), axis = 1)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    pairs = np.unique(pairs, axis = 0).reshape((-1, 2))
+
+    # Undirected adjacency as offsets into a neighbour array
+    sources = np.concatenate((pairs[:, 0], pairs[:, 1]))
+    targets = np.concatenate((pairs[:, 1], pairs[:, 0]))
+    edges = np.concatenate((np.arange(len(pairs)), np.arange(len(pairs))))
+
+    order = np.argsort(sources, kind = 'stable')
+    offsets = np.zeros(len(csr.node_ids) + 1, dtype = np.int64)
+    np.cumsum(np.bincount(sources, minlength = len(csr.node_ids)), out = offsets[1:])
+
+    offsets = offsets.tolist()
+    neighbours = targets[order].tolist()
+    neighbour_edges = edges[order].tolist()
+
+    visited = [False] * len(pairs)
+    polylines = []
+
+    def walk(node, position):
+        polyline = [node]
+
+        while True:
+            visited[neighbour_edges[position]] = True
+            node = neighbours[position]
+            polyline.append(node)
+
+            if offsets[node + 1] - offsets[node] != 2: break
+
+            # Continue over the other edge of the intermediate node
+            arrival = neighbour_edges[position]
+            position = offsets[node] if neighbour_edges[offsets[node]] != arrival else offsets[node] + 1
+            if visited[neighbour_edges[position]]: break
+
+        return polyline
+
+    # Chains starting at junctions and dead ends first, then isolated cycles
+    ends = [node for node in range(len(csr.node_ids)) if offsets[node + 1] - offsets[node] not in (0, 2)]
+
+    for node in ends + list(range(len(csr.node_ids))):
+        for position in range(offsets[node], offsets[node + 1]):
+            if not visited[neighbour_edges[position]]:
+                polylines.append(walk(node, position))
+
+    return polylines
+
+def simplify_polyline(points, tolerance):
+    # Iterative Douglas-Peucker
+    keep = np.zeros(len(points), dtype = bool)
+    keep[0], keep[-1] = True, True
+    pending = [(0, len(points) - 1)]
+
+    while len(pending) > 0:
+        first, last = pending.pop()
+        if last <= first + 1: continue
+
+        start, direction = points[first], points[last] - points[first]
+        offsets = points[first + 1:last] - start
+        length = np.sqrt(np.dot(direction, direction))
+
+        if length > 0.0:
+            distances = np.abs(offsets[:, 0] * direction[1] - offsets[:, 1] * direction[0]) / length
+        else:
+            distances = np.sqrt(np.sum(offsets**2, axis = 1))
+
+        index = np.argmax(distances)
+
+        if distances[index] > tolerance:
+            index += first + 1
+            keep[index] = True
+            pending.append((first, index))
+            pending.append((index, last))
+
+    return points[keep]
+
+class LevelOfDetail:
+    def __init__(self, network):
+        self.coords = network.to_csr().coords
+        self.polylines = [np.array(polyline, dtype = np.int64) for polyline in find_polylines(network)]
+
+        self.levels = {}
+
+    def get_polylines(self, pixel_size):
+        # Simplified coordinate arrays, polylines smaller than a pixel are dropped
+        if not pixel_size in self.levels:
+            polylines = []
+
+            for indices in self.polylines:
+                points = self.coords[indices]
+
+                if np.max(np.max(points, axis = 0) - np.min(points, axis = 0)) >= pixel_size:
+                    polylines.append(simplify_polyline(points, 0.5 * pixel_size))
+
+            self.levels[pixel_size] = polylines
+
+        return self.levels[pixel_size]
+
+def get_pixel_size(ax, minimum, maximum):
+    # Size of a screen pixel in network units if the extent fills the axes
+    extent = ax.get_window_extent()
+    return max((maximum[0] - minimum[0]) / max(extent.width, 1.0), (maximum[1] - minimum[1]) / max(extent.height, 1.0))
+
+def plot_background(network, ax = None, pixel_size = None, rasterized = True, level_of_detail = None, **style):
+    ax = ax if ax is not None else plt.gca()
+    level_of_detail = LevelOfDetail(network) if level_of_detail is None else level_of_detail
+
+    coords = level_of_detail.coords
+    minimum, maximum = np.min(coords, axis = 0), np.max(coords, axis = 0)
+    pixel_size = get_pixel_size(ax, minimum, maximum) if pixel_size is None else pixel_size
+
+    style = dict({ 'color' : 'k', 'linewidth' : 1.0 }, **style)
+    collection = matplotlib.collections.LineCollection(level_of_detail.get_polylines(pixel_size), rasterized = rasterized, **style)
+
+    ax.add_collection(collection)
+    ax.update_datalim([minimum, maximum])
+    ax.autoscale_view()
+
+    return collection
+
+def _select(bounds, minima, maxima):
+    return np.flatnonzero((maxima[:, 0] >= bounds[0]) & (minima[:, 0] <= bounds[2]) & (maxima[:, 1] >= bounds[1]) & (minima[:, 1] <= bounds[3]))
+
+def _get_bounds(polylines):
+    if len(polylines) == 0: return np.zeros((0, 2)), np.zeros((0, 2))
+    return np.array([np.min(points, axis = 0) for points in polylines]), np.array([np.max(points, axis = 0) for points in polylines])
+
+def _render_tile(task):
+    path, bounds, tile_size, polylines, style, highlights = task
+
+    figure = matplotlib.figure.Figure(figsize = (1.0, 1.0), dpi = tile_size)
+    canvas = matplotlib.backends.backend_agg.FigureCanvasAgg(figure)
+
+    ax = figure.add_axes([0.0, 0.0, 1.0, 1.0])
+    ax.set_axis_off()
+
+    ax.add_collection(matplotlib.collections.LineCollection(polylines, **style))
+
+    for segments, highlight_style in highlights:
+        ax.add_collection(matplotlib.collections.LineCollection(segments, **highlight_style))
+
+    ax.set_xlim(bounds[0], bounds[2])
+    ax.set_ylim(bounds[1], bounds[3])
+
+    figure.savefig(path, transparent = True)
+    return path
+
+def export_tiles(network, directory, zoom_levels, tile_size = 256, processes = None, highlights = [], style = None):
+    # Writes directory/zoom/x/y.png. At zoom z the square around the network is
+    # divided into 2^z x 2^z tiles, y counts from the top. highlights is a list
+    # of (link ids, style) drawn on top of the background. Empty tiles are
+    # skipped. Returns the written paths.
+    level_of_detail = LevelOfDetail(network)
+    style = dict({ 'color' : 'k', 'linewidth' : 0.5 }, **({} if style is None else style))
+
+    minimum = np.min(level_of_detail.coords, axis = 0)
+    size = np.max(np.max(level_of_detail.coords, axis = 0) - minimum)
+    top = minimum[1] + size
+
+    highlight_segments = []
+
+    for link_ids, highlight_style in highlights:
+        segments = np.array([network.get_link_coords(network.links[link_id]) for link_id in link_ids]).reshape((-1, 2, 2))
+        highlight_segments.append((segments, highlight_style, np.min(segments, axis = 1), np.max(segments, axis = 1)))
+
+    tasks = []
+
+    for zoom in zoom_levels:
+        count = 2**zoom
+        tile_extent = size / count
+
+        polylines = level_of_detail.get_polylines(tile_extent / tile_size)
+        minima, maxima = _get_bounds(polylines)
+
+        for x in range(count):
+            for y in range(count):
+                bounds = (minimum[0] + x * tile_extent, top - (y + 1) * tile_extent, minimum[0] + (x + 1) * tile_extent, top - y * tile_extent)
+
+                tile_polylines = [polylines[index] for index in _select(bounds, minima, maxima)]
+                tile_highlights = [(segments[_select(bounds, lower, upper)], highlight_style) for segments, highlight_style, lower, upper in highlight_segments]
+                tile_highlights = [item for item in tile_highlights if len(item[0]) > 0]
+
+                if len(tile_polylines) == 0 and len(tile_highlights) == 0: continue
+
+                path = os.path.join(directory, str(zoom), str(x), '%d.png' % y)
+                if not os.path.exists(os.path.dirname(path)): os.makedirs(os.path.dirname(path))
+
+                tasks.append((path, bounds, tile_size, tile_polylines, style, tile_highlights))
+
+    if processes is None or processes == 1:
+        return list(map(_render_tile, tasks))
+
+    with multiprocessing.Pool(processes) as pool:
+        return list(pool.imap_unordered(_render_tile, tasks, max(1, len(tasks) // (4 * processes))))
@@ -1,5 +1,5 @@
 from . import utils
-import xml.sax
+import xml.sax, xml.parsers.expat
 import numpy as np
 import matplotlib.pyplot as plt
 import re
@@ -50,6 +50,162 @@ class TransitRouteDeparture:
         self.departure_time = departure_time
         self.vehicle_id = vehicle_id
 
+class CompactTransitRoute:
+    # Stops and links are index arrays into the schedule, offsets and departure
+    # times are integer seconds. Departures given by headway as (first, last,
+    # interval, vehicle id prefix) are only expanded when requested.
+
+    def __init__(self, id, stop_indices, offsets, link_indices):
+        self.id = id
+
+        self.stop_indices = np.asarray(stop_indices, dtype = np.int32)
+        self.offsets = np.asarray(offsets, dtype = np.int32)
+        self.link_indices = np.asarray(link_indices, dtype = np.int32)
+
+        self.departure_ids = []
+        self.departure_times = np.zeros(0, dtype = np.int32)
+        self.vehicle_ids = []
+        self.headways = []
+
+    def set_departures(self, ids, times, vehicle_ids):
+        self.departure_ids = list(ids)
+        self.departure_times = np.asarray(times, dtype = np.int32)
+        self.vehicle_ids = list(vehicle_ids)
+
+    def add_headway(self, first, last, interval, vehicle_prefix):
+        self.headways.append((int(first), int(last), int(interval), vehicle_prefix))
+
+    def get_departure_count(self):
+        return len(self.departure_ids) + sum([(last - first) // interval + 1 for first, last, interval, prefix in self.headways if last >= first])
+
+    def get_departures(self):
+        # Returns departure ids, times and vehicle ids. Generated departures
+        # are numbered after the explicit ones, the vehicle ids are the prefix
+        # followed by the departure number.
+        ids, times, vehicle_ids = list(self.departure_ids), [self.departure_times], list(self.vehicle_ids)
+
+        for first, last, interval, prefix in self.headways:
+            generated = np.arange(first, last + 1, interval, dtype = np.int32)
+            numbers = range(len(ids), len(ids) + len(generated))
+
+            ids += [str(number) for number in numbers]
+            vehicle_ids += [prefix + str(number) for number in numbers]
+            times.append(generated)
+
+        return ids, np.concatenate(times), vehicle_ids
+
+class CompactTransitSchedule:
+    def __init__(self, schedule = None):
+        self.stop_ids = []
+        self.stop_indices = {}
+        self.stop_coords = []
+        self.stop_link_ids = []
+        self.stop_names = []
+
+        self.link_ids = []
+        self.link_indices = {}
+
+        # { line id : { route id : CompactTransitRoute } }
+        self.lines = {}
+
+        if schedule is not None:
+            self.read_schedule(schedule)
+
+    def add_stop_facility(self, id, coords, link_id, name):
+        self.stop_indices[id] = len(self.stop_ids)
+        self.stop_ids.append(id)
+        self.stop_coords.append(coords)
+        self.stop_link_ids.append(link_id)
+        self.stop_names.append(name)
+
+    def get_stop_coords(self):
+        return np.array(self.stop_coords, dtype = np.float64).reshape((len(self.stop_ids), 2))
+
+    def _get_link_index(self, link_id):
+        if not link_id in self.link_indices:
+            self.link_indices[link_id] = len(self.link_ids)
+            self.link_ids.append(link_id)
+
+        return self.link_indices[link_id]
+
+    def add_route(self, line_id, route_id, stop_ids, offsets, link_ids):
+        stop_indices = [self.stop_indices[stop_id] for stop_id in stop_ids]
+        link_indices = [self._get_link_index(link_id) for link_id in link_ids]
+
+        route = CompactTransitRoute(route_id, stop_indices, offsets, link_indices)
+        self.lines.setdefault(line_id, {})[route_id] = route
+
+        return route
+
+    def get_line_facilities(self, line_id):
+        indices = set()
+
+        for route in self.lines[line_id].values():
+            indices.update(route.stop_indices.tolist())
+
+        return [self.stop_ids[index] for index in sorted(indices)]
+
+    def read_schedule(self, schedule):
+        for facility in schedule.stop_facilities.values():
+            self.add_stop_facility(facility.id, facility.coords, facility.link_id, facility.name)
+
+        for line_id, line in schedule.lines.items():
+            self.lines[line_id] = {}
+
+            for route_id, route in line.routes.items():
+                offsets = utils.parse_times([stop.offset for stop in route.stops])
+                compact = self.add_route(line_id, route_id, [stop.stop_id for stop in route.stops], offsets, route.links)
+
+                departures = route.departures
+                times = utils.parse_times([departure.departure_time for departure in departures])
+                compact.set_departures([departure.id for departure in departures], times, [departure.vehicle_id for departure in departures])
+
+    def read(self, path, block_size = 2**20):
+        # Streams the schedule file into the arrays without building a
+        # TransitSchedule, the times of a route are parsed at once
+        for kind, item in _stream_schedule(path, block_size):
+            if kind == 'stopFacility':
+                self.add_stop_facility(item.id, item.coords, item.link_id, item.name)
+
+            elif kind == 'transitLine':
+                self.lines.setdefault(item, {})
+
+            else:
+                line_id, route = item
+                departures = route.departures
+
+                times = utils.parse_times([stop.offset for stop in route.stops] + [departure.departure_time for departure in departures])
+                offsets, times = times[:len(route.stops)], times[len(route.stops):]
+
+                compact = self.add_route(line_id, route.id, [stop.stop_id for stop in route.stops], offsets, route.links)
+                compact.set_departures([departure.id for departure in departures], times, [departure.vehicle_id for departure in departures])
+
+        return self
+
+    def to_schedule(self, schedule = None):
+        schedule = TransitSchedule() if schedule is None else schedule
+
+        for index, stop_id in enumerate(self.stop_ids):
+            facility = TransitStopFacility(stop_id, self.stop_coords[index], self.stop_link_ids[index], self.stop_names[index])
+            schedule.stop_facilities[stop_id] = facility
+
+        for line_id, routes in self.lines.items():
+            line = TransitLine(line_id)
+            schedule.lines[line_id] = line
+
+            for route_id, compact in routes.items():
+                route = TransitRoute(route_id)
+                line.routes[route_id] = route
+
+                offsets = utils.format_times(compact.offsets)
+                route.stops = [TransitRouteStop(self.stop_ids[index], offset) for index, offset in zip(compact.stop_indices.tolist(), offsets)]
+                route.links = [self.link_ids[index] for index in compact.link_indices.tolist()]
+
+                ids, times, vehicle_ids = compact.get_departures()
+                route.departures = [TransitRouteDeparture(*item) for item in zip(ids, utils.format_times(times), vehicle_ids)]
+
+        return schedule
+
 class TransitScheduleReader(xml.sax.ContentHandler):
     def __init__(self, schedule):
         self.schedule = schedule
@@ -71,6 +227,9 @@ class TransitScheduleReader(xml.sax.ContentHandler):
     def _read_transit_route_link(self, transit_route, attributes):
         transit_route.links.append(attributes['refId'])
 
+    def _read_transit_route_departure(self, transit_route, attributes):
+        transit_route.departures.append(TransitRouteDeparture(attributes['id'], attributes['departureTime'], attributes['vehicleRefId']))
+
     def _read_transit_route(self, transit_line, attributes):
         route = TransitRoute(attributes['id'])
         transit_line.routes[route.id] = route
@@ -91,7 +250,7 @@ class TransitScheduleReader(xml.sax.ContentHandler):
         schedule.stop_facilities[facility.id] = facility
 
     def _read_coords(self, attributes):
-        return np.array((attributes['x'], attributes['y'])).astype(np.float)
+        return np.array((attributes['x'], attributes['y'])).astype(np.float64)
 
     def startElement(self, name, attributes):
         if name == 'stopFacility':
@@ -109,10 +268,80 @@ class TransitScheduleReader(xml.sax.ContentHandler):
         if name == 'link' and self.route is not None:
             self._read_transit_route_link(self.route, attributes)
 
+        if name == 'departure' and self.route is not None:
+            self._read_transit_route_departure(self.route, attributes)
+
     def endElement(self, name):
         if name == 'transitLine': self.line = None
         if name == 'transitRoute': self.route = None
 
+def _stream_schedule(path, block_size):
+    # Yields ('stopFacility', facility), ('transitLine', line id) and
+    # ('transitRoute', (line id, route)) while the file is parsed block by block
+    # Processing instructions, the internal DOCTYPE subset, the standalone
+    # declaration and all other elements are not reported, so a schedule that
+    # is written again from the stream gets the prolog of ScheduleWriter.
+    items = []
+    state = { 'line' : None, 'route' : None }
+
+    def start_element(name, attributes):
+        route = state['route']
+
+        if name == 'stopFacility':
+            coords = np.array((attributes['x'], attributes['y']), dtype = np.float64)
+            items.append((name, TransitStopFacility(attributes['id'], coords, attributes.get('linkRefId'), attributes.get('name'))))
+
+        elif name == 'transitLine':
+            state['line'] = attributes['id']
+            items.append((name, state['line']))
+
+        elif name == 'transitRoute' and state['line'] is not None:
+            state['route'] = TransitRoute(attributes['id'])
+
+        elif route is None:
+            pass
+
+        elif name == 'stop':
+            route.stops.append(TransitRouteStop(attributes['refId'], attributes['departureOffset']))
+
+        elif name == 'link':
+            route.links.append(attributes['refId'])
+
+        elif name == 'departure':
+            route.departures.append(TransitRouteDeparture(attributes['id'], attributes['departureTime'], attributes['vehicleRefId']))
+
+    def end_element(name):
+        if name == 'transitRoute' and state['route'] is not None:
+            items.append((name, (state['line'], state['route'])))
+            state['route'] = None
+
+        if name == 'transitLine':
+            state['line'] = None
+
+    parser = xml.parsers.expat.ParserCreate()
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+
+    with utils.open_by_extension(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            parser.Parse(block, len(block) == 0)
+
+            for item in items: yield item
+            del items[:]
+
+            if len(block) == 0: break
+
+def iterate_stop_facilities(path, block_size = 2**20):
+    for kind, item in _stream_schedule(path, block_size):
+        if kind != 'stopFacility': return
+        yield item
+
+def iterate_transit_routes(path, block_size = 2**20):
+    # Yields (line id, TransitRoute) including the departures, one route at a time
+    for kind, item in _stream_schedule(path, block_size):
+        if kind == 'transitRoute': yield item
+
 class ScheduleWriter:
     def __init__(self, schedule):
         self.schedule = schedule
@@ -156,7 +385,10 @@ class ScheduleWriter:
         self._write('<departure id="%s" departureTime="%s" vehicleRefId="%s"/>' % (departure.id, departure.departure_time, departure.vehicle_id))
 
     def _write_route(self, route):
-        self._write('<transitRoute id="%s">' % route.id)
+        self._write_route_elements(route.id, route.stops, route.links, route.departures)
+
+    def _write_route_elements(self, route_id, stops, links, departures):
+        self._write('<transitRoute id="%s">' % route_id)
         self.indent += 1
 
         self._write('<transportMode>bus</transportMode>')
@@ -164,7 +396,7 @@ class ScheduleWriter:
         self._write('<routeProfile>')
         self.indent += 1
 
-        for stop in route.stops:
+        for stop in stops:
             self._write_route_stop(stop)
 
         self.indent -= 1
@@ -173,7 +405,7 @@ class ScheduleWriter:
         self._write('<route>')
         self.indent += 1
 
-        for link in route.links:
+        for link in links:
             self._write_route_link(link)
 
         self.indent -= 1
@@ -182,7 +414,7 @@ class ScheduleWriter:
         self._write('<departures>')
         self.indent += 1
 
-        for departure in route.departures:
+        for departure in departures:
             self._write_route_departure(departure)
 
         self.indent -= 1
@@ -205,8 +437,10 @@ class ScheduleWriter:
         for line in self.schedule.lines.values():
             self._write_line(line)
 
-    def write(self, path):
-        self.handle = utils.open_by_extension(path, 'w+')
+    def write(self, path, compresslevel = 9, threads = None):
+        # Returns the statistics of utils.BufferedWriter
+        self.handle = utils.BufferedWriter(path, compresslevel = compresslevel, threads = threads)
+        self.indent = 0
 
         self._write('<?xml version="1.0" encoding="UTF-8"?>')
         self._write('<!DOCTYPE transitSchedule SYSTEM "http://www.matsim.org/files/dtd/transitSchedule_v1.dtd">')
@@ -221,3 +455,41 @@ class ScheduleWriter:
         self._write('</transitSchedule>')
 
         self.handle.close()
+        return self.handle.get_statistics()
+
+class CompactScheduleWriter(ScheduleWriter):
+    # Writes a CompactTransitSchedule, times are formatted per route at once
+
+    def _write_stop_facilities(self):
+        self._write('<transitStops>')
+        self.indent += 1
+
+        for index, stop_id in enumerate(self.schedule.stop_ids):
+            self._write_facility(TransitStopFacility(stop_id, self.schedule.stop_coords[index], self.schedule.stop_link_ids[index], self.schedule.stop_names[index]))
+
+        self.indent -= 1
+        self._write('</transitStops>')
+
+    def _write_route(self, route):
+        stop_ids, link_ids = self.schedule.stop_ids, self.schedule.link_ids
+        ids, times, vehicle_ids = route.get_departures()
+
+        stops = [TransitRouteStop(stop_ids[index], offset) for index, offset in zip(route.stop_indices.tolist(), utils.format_times(route.offsets))]
+        links = [link_ids[index] for index in route.link_indices.tolist()]
+        departures = [TransitRouteDeparture(*departure) for departure in zip(ids, utils.format_times(times), vehicle_ids)]
+
+        self._write_route_elements(route.id, stops, links, departures)
+
+    def _write_line(self, line_id):
+        self._write('<transitLine id="%s">' % line_id)
+        self.indent += 1
+
+        for route in self.schedule.lines[line_id].values():
+            self._write_route(route)
+
+        self.indent -= 1
+        self._write('</transitLine>')
+
+    def _write_lines(self):
+        for line_id in self.schedule.lines:
+            self._write_line(line_id)
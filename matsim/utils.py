@@ -1,4 +1,4 @@
-import gzip
+import gzip, time, collections, concurrent.futures
 import xml.sax
 import numpy as np
 
@@ -9,7 +9,95 @@ def open_by_extension(path, mode = 'r'):
         return open(path, mode)
 
 def dtime(time):
-    return np.dot(np.array(time.split(':')).astype(np.float), [3600, 60, 1])
+    return np.dot(np.array(time.split(':')).astype(np.float64), [3600, 60, 1])
 
 def stime(time):
     return '%02d:%02d:%02d' % (time // 3600, (time % 3600) // 60, time % 60)
+
+def parse_times(times):
+    # Vectorized dtime, returns integer seconds
+    times = list(times)
+    if len(times) == 0: return np.zeros(0, dtype = np.int64)
+
+    values = np.array(':'.join(times).split(':'), dtype = np.float64).reshape((len(times), 3))
+    return np.dot(values, [3600, 60, 1]).astype(np.int64)
+
+def format_times(times):
+    # Vectorized stime
+    hours, rest = np.divmod(np.asarray(times, dtype = np.int64), 3600)
+    minutes, seconds = np.divmod(rest, 60)
+
+    return ['%02d:%02d:%02d' % item for item in zip(hours.tolist(), minutes.tolist(), seconds.tolist())]
+
+class BufferedWriter:
+    # Collects text and writes it in large encoded blocks. With threads, gzip
+    # blocks are compressed in parallel as independent gzip members, which
+    # concatenated form a valid gzip file.
+
+    def __init__(self, path, buffer_size = 2**20, compresslevel = 9, threads = None):
+        self.compressed = path[-2:] == 'gz'
+        self.parallel = self.compressed and threads is not None and threads > 1
+
+        if self.compressed and not self.parallel:
+            self.handle = gzip.open(path, 'wb', compresslevel = compresslevel)
+        else:
+            self.handle = open(path, 'wb')
+
+        self.compresslevel = compresslevel
+        self.buffer_size = buffer_size
+        self.parts = []
+        self.size = 0
+
+        self.bytes = 0
+        self.start_time = time.time()
+        self.end_time = None
+
+        if self.parallel:
+            self.threads = threads
+            self.executor = concurrent.futures.ThreadPoolExecutor(threads)
+            self.blocks = collections.deque()
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        data = ''.join(self.parts).encode('utf-8')
+        self.bytes += len(data)
+        self.parts = []
+        self.size = 0
+
+        if self.parallel:
+            self.blocks.append(self.executor.submit(gzip.compress, data, self.compresslevel))
+
+            # Bound the number of blocks held in memory
+            while len(self.blocks) > 2 * self.threads:
+                self.handle.write(self.blocks.popleft().result())
+        else:
+            self.handle.write(data)
+
+    def close(self):
+        self.flush()
+
+        if self.parallel:
+            while len(self.blocks) > 0:
+                self.handle.write(self.blocks.popleft().result())
+
+            self.executor.shutdown()
+
+        self.handle.close()
+        self.end_time = time.time()
+
+    def get_statistics(self):
+        # Uncompressed bytes, seconds and bytes per second
+        seconds = (self.end_time if self.end_time is not None else time.time()) - self.start_time
+        return self.bytes, seconds, self.bytes / seconds if seconds > 0 else np.inf
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,174 @@
+"""
+    Validation of a network in one pass over the links. The report lists
+
+        - dangling links (start or end node does not exist)
+        - duplicate links (several links between the same nodes)
+        - sources (no incoming links) and sinks (no outgoing links)
+        - orphaned nodes (no links at all, reported as detached nodes by the
+          former check_network.py)
+        - disconnected nodes (outside of the largest strongly connected
+          component, i.e. not reachable in both directions from most nodes)
+        - links with zero, negative or invalid lengths
+        - link attributes that are not part of network_v1.dtd
+
+    Usage: python -m matsim.validation [--json] network.xml[.gz] ...
+
+    The exit code is 1 if any of the networks has issues.
+"""
+
+from .network import CSRNetwork, FastNetworkReader, find_strongly_connected_components
+import numpy as np
+import sys, json
+
+KNOWN_LINK_ATTRIBUTES = set(['freespeed', 'capacity', 'permlanes', 'oneway', 'origid', 'type', 'modes'])
+
+class ValidationReport:
+    def __init__(self):
+        self.node_count = 0
+        self.link_count = 0
+        self.components = 0
+
+        self.dangling_links = []
+        self.duplicate_links = []
+        self.sources = []
+        self.sinks = []
+        self.orphaned_nodes = []
+        self.disconnected_nodes = []
+        self.invalid_lengths = []
+        self.unknown_attributes = {}
+
+    def is_valid(self):
+        return not any((
+            self.dangling_links, self.duplicate_links, self.sources, self.sinks,
+            self.orphaned_nodes, self.disconnected_nodes, self.invalid_lengths, self.unknown_attributes
+        ))
+
+    def to_dict(self):
+        return {
+            'nodes' : self.node_count,
+            'links' : self.link_count,
+            'components' : self.components,
+            'dangling_links' : self.dangling_links,
+            'duplicate_links' : self.duplicate_links,
+            'sources' : self.sources,
+            'sinks' : self.sinks,
+            'orphaned_nodes' : self.orphaned_nodes,
+            'disconnected_nodes' : self.disconnected_nodes,
+            'invalid_lengths' : self.invalid_lengths,
+            'unknown_attributes' : self.unknown_attributes
+        }
+
+    def summary(self):
+        lines = [
+            'Found %d links with non-existant nodes' % len(self.dangling_links),
+            'Found %d duplicate links' % len(self.duplicate_links),
+            'Found %d orphaned nodes (without any links)' % len(self.orphaned_nodes),
+            'Found %d sinks' % len(self.sinks),
+            'Found %d sources' % len(self.sources),
+            'Found %d strongly connected components' % self.components,
+            'Found %d disconnected nodes (outside of the largest strongly connected component)' % len(self.disconnected_nodes),
+            'Found %d links with zero or negative length' % len(self.invalid_lengths)
+        ]
+
+        for name, link_ids in sorted(self.unknown_attributes.items()):
+            lines.append('Found unknown attribute "%s" on %d links' % (name, len(link_ids)))
+
+        return lines
+
+def validate(network):
+    report = ValidationReport()
+
+    node_ids = list(network.nodes.keys())
+    node_indices = { node_id : index for index, node_id in enumerate(node_ids) }
+    links = list(network.links.values())
+    link_ids = [link.id for link in links]
+
+    report.node_count = len(node_ids)
+    report.link_count = len(links)
+
+    from_indices = np.array([node_indices.get(link.from_node_id, -1) for link in links], dtype = np.int64)
+    to_indices = np.array([node_indices.get(link.to_node_id, -1) for link in links], dtype = np.int64)
+    lengths = np.array([link.length for link in links], dtype = np.float64)
+
+    # Dangling links are excluded from all topological checks
+    dangling = (from_indices < 0) | (to_indices < 0)
+    report.dangling_links = [link_ids[index] for index in np.flatnonzero(dangling)]
+
+    valid = np.flatnonzero(~dangling)
+    from_valid, to_valid = from_indices[valid], to_indices[valid]
+
+    # Duplicates are found by grouping the (from, to) pairs
+    pairs = from_valid * max(len(node_ids), 1) + to_valid
+    unique, inverse, counts = np.unique(pairs, return_inverse = True, return_counts = True)
+    inverse = inverse.reshape(-1)
+
+    duplicate = np.flatnonzero(counts[inverse] > 1)
+    duplicate = duplicate[np.argsort(inverse[duplicate], kind = 'stable')]
+
+    if len(duplicate) > 0:
+        boundaries = np.flatnonzero(np.diff(inverse[duplicate])) + 1
+        report.duplicate_links = [[link_ids[index] for index in valid[group]] for group in np.split(duplicate, boundaries)]
+
+    # Degrees
+    out_degrees = np.bincount(from_valid, minlength = len(node_ids))
+    in_degrees = np.bincount(to_valid, minlength = len(node_ids))
+
+    orphaned = (out_degrees == 0) & (in_degrees == 0)
+    sources = (in_degrees == 0) & ~orphaned
+    sinks = (out_degrees == 0) & ~orphaned
+
+    report.orphaned_nodes = [node_ids[index] for index in np.flatnonzero(orphaned)]
+    report.sources = [node_ids[index] for index in np.flatnonzero(sources)]
+    report.sinks = [node_ids[index] for index in np.flatnonzero(sinks)]
+
+    # Connectivity
+    if len(node_ids) > 0:
+        csr = CSRNetwork()
+        csr.set_arrays(node_ids, np.zeros((len(node_ids), 2)), [link_ids[index] for index in valid], from_valid, to_valid, lengths[valid], {})
+
+        labels = find_strongly_connected_components(csr)
+        sizes = np.bincount(labels)
+
+        report.components = len(sizes)
+        report.disconnected_nodes = [node_ids[index] for index in np.flatnonzero(labels != np.argmax(sizes))]
+
+    # Lengths
+    invalid_lengths = ~(lengths > 0.0)
+    report.invalid_lengths = [link_ids[index] for index in np.flatnonzero(invalid_lengths)]
+
+    # Attributes
+    names = set()
+    for link in links: names.update(link.attributes.keys())
+
+    for name in names.difference(KNOWN_LINK_ATTRIBUTES):
+        report.unknown_attributes[name] = [link.id for link in links if name in link.attributes]
+
+    return report
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+    as_json = '--json' in arguments
+    paths = [argument for argument in arguments if argument != '--json']
+
+    if len(paths) == 0:
+        print('Usage: python -m matsim.validation [--json] network.xml[.gz] ...')
+        sys.exit(2)
+
+    success = True
+    reports = {}
+
+    for path in paths:
+        network = FastNetworkReader().read(path)
+        report = validate(network)
+        success = success and report.is_valid()
+
+        if as_json:
+            reports[path] = report.to_dict()
+        else:
+            print(path)
+            for line in report.summary(): print('    ' + line)
+
+    if as_json:
+        print(json.dumps(reports, indent = 4))
+
+    sys.exit(0 if success else 1)
@@ -1,11 +1,11 @@
 import matsim.network
 import matsim.facilities
+import matsim.intermediates
 import matplotlib.pyplot as plt
-import pickle
 
 class Plotter(matsim.network.NetworkPlotter):
     def __init__(self, transformed, shrunk, moved, removed, loose, detached, duplicates):
-        matsim.network.NetworkPlotter.__init__(self, transformed)
+        matsim.network.NetworkPlotter.__init__(self, transformed, batched = True)
         self.shrunk = shrunk
         self.moved = moved
         self.removed = removed
@@ -34,17 +34,16 @@ class Plotter(matsim.network.NetworkPlotter):
         matsim.network.NetworkPlotter.plot_link(self, link, start, end)
 
 transformed = matsim.network.Network()
-matsim.network.NetworkReader(transformed).read('network_transformed.xml')
+matsim.network.NetworkReader(transformed).read('network_transformed.xml', cache = True)
 
 shrunk = matsim.network.Network()
-matsim.network.NetworkReader(shrunk).read('network_shrunk.xml')
+matsim.network.NetworkReader(shrunk).read('network_shrunk.xml', cache = True)
 
-with open('network_shrunk.dat', 'rb') as f:
-    removed, moved = pickle.load(f)[:2]
+shrink_data = matsim.intermediates.read_id_lists('network_shrunk.npz')
+removed, moved = set(shrink_data['outside_links']), set(shrink_data['clipped_links'])
 
-with open('network_clean.dat', 'rb') as f:
-    data = pickle.load(f)
-    loose, detached, duplicates = data[1], data[3], data[4]
+cleanup_data = matsim.intermediates.read_id_lists('network_clean.npz')
+loose, detached, duplicates = set(cleanup_data['removed_links']), set(cleanup_data['detached_links']), set(cleanup_data['duplicate_links'])
 
 plotter = Plotter(transformed, shrunk, moved, removed, loose, detached, duplicates)
 
@@ -1,7 +1,7 @@
 import matsim.network
 import matsim.transit
+import matsim.rendering
 import matplotlib.pyplot as plt
-import pickle
 
 def get_skeleton_nodes():
     import pt_skeleton
@@ -12,9 +12,12 @@ def get_skeleton_nodes():
 
 class SkeletonPlotter(matsim.network.NetworkPlotter):
     def __init__(self, network, skeleton):
-        matsim.network.NetworkPlotter.__init__(self, network)
+        matsim.network.NetworkPlotter.__init__(self, network, batched = True)
         self.skeleton = skeleton
 
+    def get_link_style(self, link):
+        return None # The network is drawn as rasterized background
+
     def get_node_style(self, node):
         if node.id in skeleton_nodes:
             return { 'marker' : 'o', 'color' : 'k' }
@@ -22,7 +25,7 @@ class SkeletonPlotter(matsim.network.NetworkPlotter):
 
 class PTLinePlotter(matsim.network.NetworkPlotter):
     def __init__(self, network, route, color):
-        matsim.network.NetworkPlotter.__init__(self, network)
+        matsim.network.NetworkPlotter.__init__(self, network, batched = True)
         self.route = route
         self.color = color
 
@@ -44,7 +47,7 @@ class StopFacilityPlotter:
             plt.plot(facility.coords[0], facility.coords[1], marker = 'o', color = self.color)
 
 network = matsim.network.Network()
-matsim.network.NetworkReader(network).read('network_final.xml')
+matsim.network.NetworkReader(network).read('network_final.xml', cache = True)
 
 schedule = matsim.transit.TransitSchedule()
 matsim.transit.TransitScheduleReader(schedule).read('schedule.xml')
@@ -64,6 +67,7 @@ for line in schedule.lines.values():
         plotters.append(StopFacilityPlotter(schedule, route, color))
 
 plt.figure(figsize=(12, 12))
+matsim.rendering.plot_background(network)
 
 for plotter in plotters: plotter.plot()
 
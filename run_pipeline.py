@@ -0,0 +1,56 @@
+import matsim.pipeline
+import sys
+
+"""
+    Builds the scenario by running the numbered scripts as a pipeline. Stages
+    whose script, inputs and matsim modules did not change since the last run
+    are skipped, so changing pt_skeleton.py only runs 04_find_routes.py and the
+    stages after it.
+    Stage 05 is interactive and runs alone.
+
+    Usage: python run_pipeline.py [--force] [--threads N] [stage ...]
+"""
+
+STAGES = [
+    matsim.pipeline.Stage('01_transform_josm_network.py',
+        inputs = ['network_josm.xml'],
+        outputs = ['network_transformed.xml']),
+    matsim.pipeline.Stage('02_shrink_network.py',
+        inputs = ['network_transformed.xml', 'siouxfalls-2014/Siouxfalls_facilities.xml.gz'],
+        outputs = ['network_shrunk.xml', 'network_shrunk.npz']),
+    matsim.pipeline.Stage('03_cleanup_network.py',
+        inputs = ['network_shrunk.xml'],
+        outputs = ['network_clean.xml', 'adjacency_list.npz', 'network_clean.npz']),
+    matsim.pipeline.Stage('04_find_routes.py',
+        inputs = ['network_clean.xml', 'pt_skeleton.py'],
+        outputs = ['routes.npz']),
+    matsim.pipeline.Stage('05_stop_location_picker.py',
+        inputs = ['network_clean.xml', 'routes.npz', 'siouxfalls-2014/Siouxfalls_transitSchedule.xml'],
+        outputs = ['stop_locations.npz', 'stop_assignments.npz'],
+        interactive = True),
+    matsim.pipeline.Stage('06_apply_pt.py',
+        inputs = ['network_clean.xml', 'routes.npz', 'stop_locations.npz', 'stop_assignments.npz'],
+        outputs = ['network_final.xml', 'vehicles.xml', 'schedule.xml', 'breakpoints.npz']),
+    matsim.pipeline.Stage('plot_network_changes.py',
+        inputs = ['network_transformed.xml', 'network_shrunk.xml', 'network_shrunk.npz', 'network_clean.npz'],
+        outputs = ['network.pdf']),
+    matsim.pipeline.Stage('plot_pt_network.py',
+        inputs = ['network_final.xml', 'schedule.xml', 'pt_skeleton.py'],
+        outputs = ['pt_network.pdf'])
+]
+
+arguments = sys.argv[1:]
+force = '--force' in arguments
+threads = None
+
+if '--threads' in arguments:
+    index = arguments.index('--threads')
+    threads = int(arguments[index + 1])
+    del arguments[index:index + 2]
+
+names = [argument for argument in arguments if argument != '--force']
+
+pipeline = matsim.pipeline.Pipeline(STAGES)
+status = pipeline.run(names if len(names) > 0 else None, force = force, threads = threads)
+
+sys.exit(0 if all(value in ('finished', 'skipped') for value in status.values()) else 1)
@@ -0,0 +1,17 @@
+import numpy as np
+
+import matsim.network
+
+def make_network(nodes, links, name = None):
+    # nodes: { node id : (x, y) }, links: { link id : (from, to, length[, attributes]) }
+    network = matsim.network.Network()
+    network.name = name
+
+    for node_id, coords in nodes.items():
+        network.add_node(matsim.network.Node(node_id, np.array(coords, dtype = np.float64)))
+
+    for link_id, values in links.items():
+        attributes = dict(values[3]) if len(values) > 3 else {}
+        network.add_link(matsim.network.Link(link_id, values[0], values[1], values[2], attributes))
+
+    return network
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import matsim.network
+from networks import make_network
+
+def test_clip_cuts_crossing_links_at_the_boundary():
+    network = make_network(
+        { 'a' : (0.0, 0.0), 'b' : (10.0, 0.0), 'c' : (20.0, 0.0), 'd' : (30.0, 0.0) },
+        { 'ab' : ('a', 'b', 10.0), 'bc' : ('b', 'c', 10.0), 'cb' : ('c', 'b', 10.0), 'cd' : ('c', 'd', 10.0) })
+
+    clipped, diagnostics = network.clip(((-1.0, -1.0), (15.0, 1.0)))
+
+    assert sorted(clipped.links) == ['ab', 'bc', 'cb']
+    assert sorted(diagnostics['outside_links']) == ['cd']
+    assert sorted(diagnostics['crossing_links']) == ['bc', 'cb']
+    assert diagnostics['moved_nodes'] == ['c']
+    assert diagnostics['created_nodes'] == []
+
+    # Both directions end at the same new position of c
+    assert np.allclose(clipped.nodes['c'].coords, (15.0, 0.0))
+    assert clipped.links['bc'].to_node_id == 'c' and clipped.links['cb'].from_node_id == 'c'
+    assert clipped.links['bc'].length == pytest.approx(5.0)
+    assert 'd' not in clipped.nodes
+
+    # The original network is not modified
+    assert np.allclose(network.nodes['c'].coords, (20.0, 0.0))
+    assert network.links['bc'].length == 10.0
+
+def test_clip_creates_nodes_for_several_exits():
+    # The outside node o is reached from two nodes and is cut at two points
+    network = make_network(
+        { 'a' : (0.0, 5.0), 'b' : (0.0, -5.0), 'o' : (20.0, 0.0) },
+        { 'ao' : ('a', 'o', 20.0), 'bo' : ('b', 'o', 20.0) })
+
+    clipped, diagnostics = network.clip(((-1.0, -10.0), (10.0, 10.0)))
+
+    assert sorted(clipped.links) == ['ao', 'bo']
+    assert diagnostics['moved_nodes'] == []
+    assert sorted(diagnostics['created_nodes']) == ['o_clip1', 'o_clip2']
+    assert 'o' not in clipped.nodes
+
+    ends = sorted(tuple(clipped.nodes[clipped.links[link_id].to_node_id].coords) for link_id in ('ao', 'bo'))
+    assert np.allclose(ends, [(10.0, -2.5), (10.0, 2.5)])
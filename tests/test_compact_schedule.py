@@ -0,0 +1,105 @@
+import numpy as np
+
+import matsim.transit, matsim.utils
+
+def make_schedule():
+    schedule = matsim.transit.CompactTransitSchedule()
+
+    schedule.add_stop_facility('s1', np.array((0.0, 0.0)), 'l1', 'First')
+    schedule.add_stop_facility('s2', np.array((100.0, 0.0)), 'l2', 'Second')
+    schedule.add_stop_facility('s3', np.array((100.0, 50.5)), 'l3', 'Third')
+
+    route = schedule.add_route('line%1', 'forward', ['s1', 's2', 's3'], [0, 90, 3600 + 61], ['l1', 'l2', 'l3'])
+    route.set_departures(['early'], [5 * 3600], ['special'])
+    route.add_headway(6 * 3600, 7 * 3600, 20 * 60, 'bus_line%1_')
+
+    route = schedule.add_route('line%1', 'backward', ['s3', 's1'], [0, 300], ['l3', 'l4', 'l1'])
+    route.add_headway(8 * 3600, 8 * 3600 + 59, 60, 'night_')
+
+    schedule.lines['empty'] = {}
+    return schedule
+
+def test_headway_expansion():
+    route = matsim.transit.CompactTransitRoute('r', [0, 1], [0, 60], [0])
+    route.set_departures(['a', 'b'], [100, 200], ['v', 'w'])
+    route.add_headway(3600, 3600 + 25 * 60, 10 * 60, 'bus_%_')
+    route.add_headway(10, 5, 1, 'never_')
+
+    ids, times, vehicle_ids = route.get_departures()
+
+    assert route.get_departure_count() == 5
+    assert ids == ['a', 'b', '2', '3', '4']
+    assert times.tolist() == [100, 200, 3600, 4200, 4800]
+    assert vehicle_ids == ['v', 'w', 'bus_%_2', 'bus_%_3', 'bus_%_4']
+
+def test_headway_only_route():
+    route = matsim.transit.CompactTransitRoute('r', [0], [0], [])
+    route.add_headway(0, 0, 300, 'bus_')
+
+    ids, times, vehicle_ids = route.get_departures()
+
+    assert route.get_departure_count() == 1
+    assert (ids, times.tolist(), vehicle_ids) == (['0'], [0], ['bus_0'])
+
+def assert_same_schedule(first, second):
+    assert first.stop_ids == second.stop_ids
+    assert np.allclose(first.get_stop_coords(), second.get_stop_coords())
+    assert first.stop_link_ids == second.stop_link_ids
+    assert first.stop_names == second.stop_names
+
+    assert list(first.lines) == list(second.lines)
+
+    for line_id, routes in first.lines.items():
+        assert list(routes) == list(second.lines[line_id])
+
+        for route_id, route in routes.items():
+            other = second.lines[line_id][route_id]
+
+            assert [first.stop_ids[index] for index in route.stop_indices] == [second.stop_ids[index] for index in other.stop_indices]
+            assert [first.link_ids[index] for index in route.link_indices] == [second.link_ids[index] for index in other.link_indices]
+            assert route.offsets.tolist() == other.offsets.tolist()
+
+            ids, times, vehicle_ids = route.get_departures()
+            other_ids, other_times, other_vehicle_ids = other.get_departures()
+
+            assert ids == other_ids
+            assert times.tolist() == other_times.tolist()
+            assert vehicle_ids == other_vehicle_ids
+
+def test_writer_round_trip(tmp_path):
+    schedule = make_schedule()
+    path = str(tmp_path / 'schedule.xml.gz')
+    matsim.transit.CompactScheduleWriter(schedule).write(path, threads = 2)
+
+    # Reading the file again gives explicit departures only
+    loaded = matsim.transit.CompactTransitSchedule().read(path, block_size = 97)
+    assert all(len(route.headways) == 0 for routes in loaded.lines.values() for route in routes.values())
+    assert loaded.lines['line%1']['forward'].get_departure_count() == 5
+    assert_same_schedule(schedule, loaded)
+
+    # The object schedule gives the same arrays and the same file
+    reference = matsim.transit.TransitSchedule()
+    matsim.transit.TransitScheduleReader(reference).read(path)
+    assert_same_schedule(loaded, matsim.transit.CompactTransitSchedule(reference))
+
+    copy = str(tmp_path / 'copy.xml')
+    matsim.transit.ScheduleWriter(reference).write(copy)
+    second = str(tmp_path / 'second.xml')
+    matsim.transit.CompactScheduleWriter(loaded).write(second)
+
+    with open(copy) as f, open(second) as g:
+        assert f.read() == g.read()
+
+def test_object_schedule_conversion():
+    schedule = make_schedule()
+    converted = matsim.transit.CompactTransitSchedule(schedule.to_schedule())
+
+    assert_same_schedule(schedule, converted)
+    assert converted.get_line_facilities('line%1') == ['s1', 's2', 's3']
+
+def test_time_conversion():
+    times = ['00:00:00', '07:05:09', '25:59:59']
+
+    assert matsim.utils.parse_times(times).tolist() == [0, 7 * 3600 + 5 * 60 + 9, 25 * 3600 + 59 * 60 + 59]
+    assert matsim.utils.format_times(matsim.utils.parse_times(times)) == times
+    assert len(matsim.utils.parse_times([])) == 0
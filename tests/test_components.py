@@ -0,0 +1,61 @@
+import numpy as np
+
+import matsim.network
+from networks import make_network
+
+def find_reachable(node_ids, links, start):
+    reached, pending = set([start]), [start]
+
+    while len(pending) > 0:
+        current = pending.pop()
+
+        for from_node_id, to_node_id in links:
+            if from_node_id == current and not to_node_id in reached:
+                reached.add(to_node_id)
+                pending.append(to_node_id)
+
+    return reached
+
+def test_components_of_two_cycles():
+    network = make_network(
+        { 'a' : (0, 0), 'b' : (1, 0), 'c' : (2, 0), 'd' : (3, 0), 'e' : (4, 0), 'f' : (5, 0) },
+        { 'ab' : ('a', 'b', 1), 'ba' : ('b', 'a', 1), 'bc' : ('b', 'c', 1), 'cb' : ('c', 'b', 1), 'cd' : ('c', 'd', 1), 'de' : ('d', 'e', 1), 'ed' : ('e', 'd', 1) })
+
+    labels = matsim.network.find_strongly_connected_components(network)
+    label = dict(zip(network.to_csr().node_ids, labels.tolist()))
+
+    assert label['a'] == label['b'] == label['c']
+    assert label['d'] == label['e'] != label['a']
+    assert len(set([label['f'], label['a'], label['d']])) == 3
+    assert sorted(matsim.network.find_largest_component(network)) == ['a', 'b', 'c']
+
+def test_components_match_mutual_reachability():
+    random = np.random.RandomState(13)
+    node_ids = ['n%d' % index for index in range(40)]
+
+    for repetition in range(4):
+        pairs = [(node_ids[i], node_ids[j]) for i, j in random.choice(len(node_ids), size = (55, 2))]
+        network = make_network({ node_id : (0, 0) for node_id in node_ids }, { 'l%d' % index : pair + (1.0,) for index, pair in enumerate(pairs) })
+
+        csr = network.to_csr()
+        labels = matsim.network.find_strongly_connected_components(csr)
+        reachable = { node_id : find_reachable(node_ids, pairs, node_id) for node_id in node_ids }
+
+        for first in node_ids:
+            for second in node_ids:
+                mutual = second in reachable[first] and first in reachable[second]
+                assert (labels[csr.node_indices[first]] == labels[csr.node_indices[second]]) == mutual
+
+def test_long_chains_do_not_hit_the_recursion_limit():
+    count = 5000
+    nodes = { 'n%d' % index : (index, 0) for index in range(count) }
+    links = { 'l%d' % index : ('n%d' % index, 'n%d' % ((index + 1) % count), 1.0) for index in range(count) }
+
+    network = make_network(nodes, links)
+    assert len(matsim.network.find_largest_component(network)) == count
+
+def test_empty_network():
+    network = matsim.network.Network()
+
+    assert len(matsim.network.find_strongly_connected_components(network)) == 0
+    assert matsim.network.find_largest_component(network) == []
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import matsim.network
+import matsim.contraction
+from networks import make_network
+
+class TravelTimeDijkstra(matsim.network.Dijkstra):
+    def compute_cost(self, link):
+        return float(link.length) / float(link.attributes['freespeed'])
+
+@pytest.fixture
+def road_network():
+    # Streets of a 5x4 block pattern with random speeds, a parallel express
+    # link and a one-way spur
+    random = np.random.RandomState(10)
+    nodes, links = {}, {}
+
+    for i in range(5):
+        for j in range(4):
+            nodes['%d%d' % (i, j)] = (50.0 * i, 80.0 * j)
+
+    for i in range(5):
+        for j in range(4):
+            for other in ('%d%d' % (i + 1, j), '%d%d' % (i, j + 1)):
+                if not other in nodes: continue
+
+                for from_node_id, to_node_id in (('%d%d' % (i, j), other), (other, '%d%d' % (i, j))):
+                    speed = '%.1f' % random.uniform(5.0, 20.0)
+                    links[from_node_id + to_node_id] = (from_node_id, to_node_id, 100.0, { 'freespeed' : speed })
+
+    nodes['spur'] = (300.0, 0.0)
+    links['express'] = ('00', '10', 50.0, { 'freespeed' : '50.0' })
+    links['spur'] = ('40', 'spur', 50.0, { 'freespeed' : '10.0' })
+
+    return make_network(nodes, links)
+
+def test_routes_match_dijkstra(road_network, tmp_path):
+    dijkstra = TravelTimeDijkstra(road_network)
+
+    hierarchy = matsim.contraction.ContractionHierarchy(dijkstra)
+    hierarchy.build()
+
+    path = str(tmp_path / 'hierarchy.npz')
+    hierarchy.save(path)
+
+    loaded = matsim.contraction.ContractionHierarchy(TravelTimeDijkstra(road_network))
+    loaded.load(path)
+
+    node_ids = sorted(road_network.nodes)
+
+    for from_node_id in node_ids:
+        expected = dijkstra.find_costs(from_node_id, node_ids)
+
+        for to_node_id, cost in zip(node_ids, expected):
+            for instance in (hierarchy, loaded):
+                nodes, links, found = instance.find_route(from_node_id, to_node_id)
+                assert found == pytest.approx(cost)
+
+                if found < np.inf:
+                    assert nodes[0] == from_node_id and nodes[-1] == to_node_id
+                    assert [road_network.links[link_id].to_node_id for link_id in links] == nodes[1:]
+                    assert sum(dijkstra.compute_cost(road_network.links[link_id]) for link_id in links) == pytest.approx(found)
+
+def test_parallel_links_use_the_cheaper_one(road_network):
+    hierarchy = matsim.contraction.ContractionHierarchy(TravelTimeDijkstra(road_network))
+    hierarchy.build()
+
+    assert hierarchy.find_route('00', '10')[1] == ['express']
+
+def test_load_rejects_other_networks_and_costs(road_network, tmp_path):
+    hierarchy = matsim.contraction.ContractionHierarchy(TravelTimeDijkstra(road_network))
+    hierarchy.build()
+
+    path = str(tmp_path / 'hierarchy.npz')
+    hierarchy.save(path)
+
+    with pytest.raises(RuntimeError):
+        matsim.contraction.ContractionHierarchy(matsim.network.Dijkstra(road_network)).load(path)
+
+    road_network.remove_link('spur')
+
+    with pytest.raises(RuntimeError):
+        matsim.contraction.ContractionHierarchy(TravelTimeDijkstra(road_network)).load(path)
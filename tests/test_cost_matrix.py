@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import matsim.network
+from networks import make_network
+
+class TravelTimeDijkstra(matsim.network.Dijkstra):
+    def compute_cost(self, link):
+        return float(link.length) / float(link.attributes['freespeed'])
+
+@pytest.fixture
+def ring_network():
+    # One-way ring with a fast chord, the last node is a dead end
+    nodes = { 'r%d' % index : (np.cos(index), np.sin(index)) for index in range(8) }
+    nodes['x'] = (2.0, 0.0)
+
+    links = { 'r%d' % index : ('r%d' % index, 'r%d' % ((index + 1) % 8), 100.0, { 'freespeed' : '10.0' }) for index in range(8) }
+    links['chord'] = ('r0', 'r4', 150.0, { 'freespeed' : '30.0' })
+    links['exit'] = ('r2', 'x', 50.0, { 'freespeed' : '5.0' })
+
+    return make_network(nodes, links)
+
+def test_matrix_rows_match_single_searches(ring_network):
+    dijkstra = TravelTimeDijkstra(ring_network)
+    origins = ['r0', 'r3', 'x']
+    destinations = ['r0', 'r4', 'r7', 'x']
+
+    matrix = dijkstra.find_cost_matrix(origins, destinations)
+
+    assert matrix.shape == (3, 4)
+    for row, origin in zip(matrix, origins):
+        assert np.array_equal(row, dijkstra.find_costs(origin, destinations))
+
+    assert matrix[0].tolist() == [0.0, 5.0, 35.0, 30.0]
+    assert matrix[2].tolist() == [np.inf, np.inf, np.inf, 0.0]
+
+def test_full_matrix_with_predecessors(ring_network):
+    dijkstra = TravelTimeDijkstra(ring_network)
+    matrix, predecessors = dijkstra.find_cost_matrix(['r0', 'r5'], predecessors = True)
+
+    assert matrix.shape == (2, len(dijkstra.cache.node_ids))
+    assert predecessors.shape == matrix.shape
+
+    nodes, links = dijkstra.find_route_from_predecessors(predecessors[0], 'r6')
+    assert links == ['chord', 'r4', 'r5']
+    assert matrix[0, dijkstra.cache.node_indices['r6']] == 25.0
+
+def test_memory_mapped_and_parallel_matrices(ring_network, tmp_path):
+    dijkstra = TravelTimeDijkstra(ring_network)
+    origins = sorted(ring_network.nodes)
+
+    expected = dijkstra.find_cost_matrix(origins)
+    path = str(tmp_path / 'matrix.npy')
+
+    mapped = dijkstra.find_cost_matrix(origins, path = path, processes = 2)
+
+    assert np.array_equal(mapped, expected)
+    assert np.array_equal(np.load(path), expected)
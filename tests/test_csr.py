@@ -0,0 +1,76 @@
+import numpy as np
+
+import matsim.network
+from networks import make_network
+
+def make_star():
+    return make_network(
+        { 'c' : (0.0, 0.0), 'n' : (0.0, 1.0), 's' : (0.0, -1.0), 'e' : (1.0, 0.0) },
+        {
+            'cn' : ('c', 'n', 1.0, { 'freespeed' : '10.0' }), 'nc' : ('n', 'c', 1.0),
+            'cs' : ('c', 's', 1.5), 'ec' : ('e', 'c', 2.0, { 'freespeed' : '5.0', 'modes' : 'car' })
+        }, name = 'star')
+
+def test_arrays_follow_the_network():
+    network = make_star()
+    csr = network.to_csr()
+
+    assert sorted(csr.node_ids) == ['c', 'e', 'n', 's']
+    assert sorted(csr.link_ids) == ['cn', 'cs', 'ec', 'nc']
+
+    center = csr.node_indices['c']
+    outgoing = sorted(csr.link_ids[index] for index in csr.get_outgoing_links(center))
+    incoming = sorted(csr.link_ids[index] for index in csr.get_incoming_links(center))
+
+    assert outgoing == ['cn', 'cs'] and incoming == ['ec', 'nc']
+    assert csr.get_out_degrees()[center] == 2 and csr.get_in_degrees()[csr.node_indices['e']] == 0
+
+    link = csr.link_indices['ec']
+    assert csr.node_ids[csr.from_indices[link]] == 'e' and csr.node_ids[csr.to_indices[link]] == 'c'
+    assert csr.lengths[link] == 2.0 and csr.freespeeds[link] == 5.0
+    assert np.allclose(csr.coords[csr.node_indices['e']], (1.0, 0.0))
+
+def test_to_network_round_trip():
+    network = make_star()
+    restored = network.to_csr().to_network()
+
+    assert restored.name == 'star'
+    assert sorted(restored.nodes) == sorted(network.nodes)
+
+    for link_id, link in network.links.items():
+        other = restored.links[link_id]
+        assert (other.from_node_id, other.to_node_id, float(other.length)) == (link.from_node_id, link.to_node_id, link.length)
+        assert other.attributes == link.attributes
+
+def test_csr_is_cached_until_the_network_changes():
+    network = make_star()
+
+    csr = network.to_csr()
+    assert network.to_csr() is csr
+
+    network.add_node(matsim.network.Node('w', np.array([-1.0, 0.0])))
+    csr = network.to_csr()
+    assert 'w' in csr.node_ids
+
+    network.remove_link('cs')
+    assert network.to_csr() is not csr
+    assert not 'cs' in network.to_csr().link_ids
+
+def test_in_place_edits_need_invalidate():
+    network = make_star()
+    network.to_csr()
+
+    network.links['cn'].to_node_id = 'e'
+    network.links['cn'].length = 3.0
+    network.invalidate()
+
+    csr = network.to_csr()
+    link = csr.link_indices['cn']
+    assert csr.node_ids[csr.to_indices[link]] == 'e' and csr.lengths[link] == 3.0
+
+def test_direct_link_insertion_is_noticed():
+    network = make_star()
+    network.to_csr()
+
+    network.links['sc'] = matsim.network.Link('sc', 's', 'c', 1.5, {})
+    assert 'sc' in network.to_csr().link_ids
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import matsim.network
+from networks import make_network
+
+class LengthDijkstra(matsim.network.Dijkstra):
+    def compute_cost(self, link):
+        return float(link.length)
+
+@pytest.fixture
+def network():
+    # e only leads into the network, so it cannot be reached from anywhere
+    return make_network(
+        { 'a' : (0, 0), 'b' : (1, 0), 'c' : (2, 0), 'd' : (2, 1), 'e' : (0, 1) },
+        {
+            'ab' : ('a', 'b', 1.0), 'bc' : ('b', 'c', 2.0), 'ac' : ('a', 'c', 5.0),
+            'cd' : ('c', 'd', 1.0), 'da' : ('d', 'a', 1.0), 'bd' : ('b', 'd', 4.0),
+            'ea' : ('e', 'a', 1.0)
+        })
+
+def test_find_route(network):
+    dijkstra = LengthDijkstra(network)
+
+    nodes, links, cost = dijkstra.find_route('a', 'd')
+    assert nodes == ['a', 'b', 'c', 'd']
+    assert links == ['ab', 'bc', 'cd']
+    assert cost == 4.0
+
+    nodes, links, cost = dijkstra.find_route('b', 'b')
+    assert nodes == ['b'] and links == [] and cost == 0.0
+
+    assert dijkstra.find_route('a', 'e')[2] == np.inf
+
+def test_default_costs_count_links(network):
+    nodes, links, cost = matsim.network.Dijkstra(network).find_route('a', 'd')
+    assert links == ['ab', 'bd'] and cost == 2
+
+def test_find_costs(network):
+    dijkstra = LengthDijkstra(network)
+    node_ids = ['a', 'b', 'c', 'd', 'e']
+
+    assert dijkstra.find_costs('a', node_ids).tolist() == [0.0, 1.0, 3.0, 4.0, np.inf]
+    assert dijkstra.find_costs('a', node_ids, reverse = True).tolist() == [0.0, 4.0, 2.0, 1.0, 1.0]
+
+def test_routes_from_predecessors(network):
+    dijkstra = LengthDijkstra(network)
+    costs, predecessors = dijkstra.find_costs('b', predecessors = True)
+
+    nodes, links = dijkstra.find_route_from_predecessors(predecessors, 'a')
+    assert nodes == ['b', 'c', 'd', 'a'] and links == ['bc', 'cd', 'da']
+    assert costs[dijkstra.cache.node_indices['a']] == 4.0
@@ -0,0 +1,66 @@
+import gzip
+
+import numpy as np
+import pytest
+
+import matsim.facilities
+
+def write_facilities(path, count):
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', '<facilities name="test">']
+
+    for index in range(count):
+        lines.append('  <facility id="f%d" x="%.1f" y="%.1f">' % (index, 10.0 * index, -3.5 * index))
+
+        for activity in ('home', 'work', 'shop')[:index % 4]:
+            lines.append('    <activity type="%s" />' % activity)
+
+        lines.append('  </facility>')
+
+    lines.append('</facilities>')
+    data = ('\n'.join(lines) + '\n').encode('utf-8')
+
+    with (gzip.open(path, 'wb') if path.endswith('.gz') else open(path, 'wb')) as f:
+        f.write(data)
+
+@pytest.mark.parametrize('name', ['facilities.xml', 'facilities.xml.gz'])
+@pytest.mark.parametrize('block_size', [7, 64])
+def test_small_blocks_split_facilities(tmp_path, name, block_size):
+    path = str(tmp_path / name)
+    write_facilities(path, 23)
+
+    reader = matsim.facilities.FacilitiesReader()
+    ids, coords, types = reader.read_arrays(path, activities = True)
+    chunks = list(reader.read_chunks(path, chunk_size = 5, activities = True, block_size = block_size))
+
+    assert [len(chunk[0]) for chunk in chunks] == [5, 5, 5, 5, 3]
+    assert [id for chunk in chunks for id in chunk[0]] == ids
+    assert np.array_equal(np.vstack([chunk[1] for chunk in chunks]), coords)
+
+    # Activities that follow a chunk boundary still belong to their facility
+    assert [item for chunk in chunks for item in chunk[2]] == types
+
+def test_arrays_match_the_sax_reader(tmp_path):
+    path = str(tmp_path / 'facilities.xml')
+    write_facilities(path, 11)
+
+    reader = matsim.facilities.FacilitiesReader()
+    ids, coords, types = reader.read_arrays(path, activities = True)
+    facilities = matsim.facilities.FacilitiesReader().read(path)
+
+    assert ids == ['f%d' % index for index in range(11)]
+    assert sorted(ids) == sorted(facilities)
+
+    for id, position in zip(ids, coords):
+        assert np.array_equal(facilities[id].coords, position)
+
+    assert types[0] == () and types[3] == ('home', 'work', 'shop')
+
+def test_bounding_box(tmp_path):
+    path = str(tmp_path / 'facilities.xml')
+    write_facilities(path, 9)
+
+    minimum, maximum, count = matsim.facilities.FacilitiesReader().compute_bounding_box(path)
+
+    assert count == 9
+    assert np.allclose(minimum, (0.0, -28.0))
+    assert np.allclose(maximum, (80.0, 0.0))
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+import matsim.network
+from networks import make_network
+
+class LengthDijkstra(matsim.network.Dijkstra):
+    def compute_cost(self, link):
+        return float(link.length)
+
+@pytest.fixture
+def neighbourhood_network():
+    # Every point is linked to its three nearest neighbours, some links are
+    # one-way and lengths are at least the straight line distance
+    random = np.random.RandomState(8)
+    coords = random.uniform(0.0, 1000.0, size = (60, 2))
+
+    nodes = { 'p%d' % index : tuple(point) for index, point in enumerate(coords) }
+    links = {}
+
+    for index, point in enumerate(coords):
+        distances = np.sqrt(np.sum((coords - point)**2, axis = 1))
+
+        for other in np.argsort(distances)[1:4]:
+            length = distances[other] * (1.0 + random.rand())
+            links['p%d_p%d' % (index, other)] = ('p%d' % index, 'p%d' % other, length)
+
+            if random.rand() < 0.8:
+                links['p%d_p%d' % (other, index)] = ('p%d' % other, 'p%d' % index, length)
+
+    return make_network(nodes, links)
+
+def test_goal_directed_routes_are_shortest(neighbourhood_network):
+    dijkstra = LengthDijkstra(neighbourhood_network)
+    heuristics = [matsim.network.EuclideanHeuristic(dijkstra), matsim.network.LandmarkHeuristic(dijkstra, landmarks = 4)]
+
+    random = np.random.RandomState(9)
+    node_ids = sorted(neighbourhood_network.nodes)
+
+    for from_node_id, to_node_id in random.choice(node_ids, size = (80, 2)):
+        expected = dijkstra.find_route(from_node_id, to_node_id)
+
+        for heuristic in heuristics:
+            nodes, links, cost = dijkstra.find_route(from_node_id, to_node_id, heuristic = heuristic)
+            assert cost == pytest.approx(expected[2])
+
+            if cost < np.inf:
+                assert nodes[0] == from_node_id and nodes[-1] == to_node_id
+                assert sum(float(neighbourhood_network.links[link_id].length) for link_id in links) == pytest.approx(cost)
+
+def test_estimates_are_lower_bounds(neighbourhood_network):
+    dijkstra = LengthDijkstra(neighbourhood_network)
+    heuristics = [matsim.network.EuclideanHeuristic(dijkstra), matsim.network.LandmarkHeuristic(dijkstra, landmarks = 3)]
+
+    for target in range(0, len(dijkstra.cache.node_ids), 7):
+        costs = dijkstra.find_costs(dijkstra.cache.node_ids[target], reverse = True)
+
+        for heuristic in heuristics:
+            estimate = heuristic.get_estimator(target)
+            estimates = np.array([estimate(node) for node in range(len(costs))])
+
+            finite = np.isfinite(costs)
+            assert np.all(estimates[finite] <= costs[finite] + 1e-9)
+            assert estimate(target) == 0.0
+
+def test_landmarks_detect_unreachable_targets():
+    network = make_network(
+        { 'a' : (0, 0), 'b' : (1, 0), 'c' : (2, 0) },
+        { 'ab' : ('a', 'b', 1.0), 'ba' : ('b', 'a', 1.0), 'bc' : ('b', 'c', 1.0) })
+
+    dijkstra = LengthDijkstra(network)
+    heuristic = matsim.network.LandmarkHeuristic(dijkstra, landmarks = ['a'])
+
+    indices = dijkstra.cache.node_indices
+    assert heuristic.get_estimator(indices['a'])(indices['c']) == np.inf
+    assert dijkstra.find_route('c', 'a', heuristic = heuristic)[2] == np.inf
+    assert dijkstra.find_route('a', 'c', heuristic = heuristic)[2] == 2.0
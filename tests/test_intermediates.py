@@ -0,0 +1,52 @@
+import numpy as np
+
+import matsim.intermediates
+
+def test_routes_round_trip(tmp_path):
+    path = str(tmp_path / 'routes.npz')
+    routes = {
+        'line1' : (['a', 'b', 'c'], ['ab', 'bc']),
+        'line2' : (['c'], []),
+        'linieä' : (['ü', 'x'], ['üx'])
+    }
+
+    matsim.intermediates.write_routes(path, routes)
+    loaded = matsim.intermediates.read_routes(path)
+
+    assert loaded.keys() == list(routes.keys())
+    assert { key : loaded[key] for key in loaded } == routes
+    assert 'line1' in loaded and not 'line3' in loaded
+
+def test_locations_round_trip(tmp_path):
+    path = str(tmp_path / 'locations.npz')
+    locations = [np.array([1.5, 2.5]), np.array([683309.80634408, 4822690.7490328])]
+
+    matsim.intermediates.write_locations(path, locations)
+    assert np.array_equal(matsim.intermediates.read_locations(path), np.array(locations))
+
+    matsim.intermediates.write_locations(path, [])
+    assert matsim.intermediates.read_locations(path).shape == (0, 2)
+
+def test_assignments_round_trip(tmp_path):
+    path = str(tmp_path / 'assignments.npz')
+    assignments = { 'line1' : [0, 3, 2], 'line2' : [] }
+
+    matsim.intermediates.write_assignments(path, assignments)
+    loaded = matsim.intermediates.read_assignments(path)
+
+    assert dict(loaded.items()) == assignments
+
+def test_adjacency_round_trip(tmp_path):
+    path = str(tmp_path / 'adjacency.npz')
+    adjacency_list = { 'a' : set(['c', 'b']), 'b' : set(), 'c' : set(['a']) }
+
+    matsim.intermediates.write_adjacency(path, adjacency_list)
+    loaded = matsim.intermediates.read_adjacency(path)
+
+    assert dict(loaded.items()) == { 'a' : ['b', 'c'], 'b' : [], 'c' : ['a'] }
+
+def test_id_lists_round_trip(tmp_path):
+    path = str(tmp_path / 'ids.npz')
+
+    matsim.intermediates.write_id_lists(path, removed_nodes = ['1', '2'], removed_links = [])
+    assert matsim.intermediates.read_id_lists(path) == { 'removed_nodes' : ['1', '2'], 'removed_links' : [] }
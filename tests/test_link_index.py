@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import matsim.network
+from networks import make_network
+
+@pytest.fixture
+def scattered_network():
+    # Random segments of very different lengths, so that links span many cells
+    random = np.random.RandomState(4)
+    nodes = { 'n%d' % index : tuple(coords) for index, coords in enumerate(random.uniform(0.0, 1000.0, size = (40, 2))) }
+    node_ids = sorted(nodes)
+
+    links = {}
+
+    for index in range(80):
+        from_node_id, to_node_id = random.choice(node_ids, 2, replace = False)
+        links['l%d' % index] = (from_node_id, to_node_id, 1.0)
+
+    return make_network(nodes, links)
+
+def rank_links(network, coords):
+    return sorted((network.compute_distance_to_link(coords, link), link.id) for link in network.links.values())
+
+def test_nearest_links_match_brute_force(scattered_network):
+    random = np.random.RandomState(5)
+
+    for coords in random.uniform(-500.0, 1500.0, size = (100, 2)):
+        expected = [link_id for distance, link_id in rank_links(scattered_network, coords)[:3]]
+
+        assert scattered_network.find_closest_link(coords).id == expected[0]
+        assert [link.id for link in scattered_network.find_closest_links(coords, 3)] == expected
+
+def test_links_within_radius(scattered_network):
+    random = np.random.RandomState(6)
+
+    for coords in random.uniform(0.0, 1000.0, size = (50, 2)):
+        expected = [link_id for distance, link_id in rank_links(scattered_network, coords) if distance <= 50.0]
+        assert [link.id for link in scattered_network.find_links_within(coords, 50.0)] == expected
+
+def test_ties_resolve_by_link_id():
+    network = make_network(
+        { 'a' : (0.0, 1.0), 'b' : (10.0, 1.0), 'c' : (0.0, -1.0), 'd' : (10.0, -1.0) },
+        { 'upper' : ('a', 'b', 10.0), 'lower' : ('c', 'd', 10.0) })
+
+    assert network.find_closest_link(np.array([5.0, 0.0])).id == 'lower'
+
+def test_index_is_rebuilt_for_new_links():
+    network = make_network({ 'a' : (0.0, 0.0), 'b' : (10.0, 0.0), 'c' : (0.0, 100.0), 'd' : (10.0, 100.0) }, { 'ab' : ('a', 'b', 10.0) })
+    assert network.find_closest_link(np.array([5.0, 99.0])).id == 'ab'
+
+    network.add_link(matsim.network.Link('cd', 'c', 'd', 10.0, {}))
+    assert network.find_closest_link(np.array([5.0, 99.0])).id == 'cd'
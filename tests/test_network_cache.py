@@ -0,0 +1,103 @@
+import os
+import numpy as np
+import pytest
+
+import matsim.network
+
+TEMPLATE = '''<?xml version="1.0" encoding="UTF-8"?>
+<network name="cached">
+	<nodes>
+		<node id="a" x="0.0" y="0.0" />
+		<node id="b" x="%s" y="0.0" />
+	</nodes>
+	<links>
+		<link id="ab" from="a" to="b" length="%s" freespeed="10.0" modes="car" />
+	</links>
+</network>
+'''
+
+def write_network(path, value, mtime_ns = None):
+    with open(path, 'w') as f:
+        f.write(TEMPLATE % (value, value))
+
+    if mtime_ns is not None:
+        os.utime(path, ns = (mtime_ns, mtime_ns))
+
+def read_length(path, **arguments):
+    network = matsim.network.Network()
+    matsim.network.NetworkReader(network).read(path, cache = True, **arguments)
+    return float(network.links['ab'].length)
+
+def read_array_length(path, **arguments):
+    return matsim.network.FastNetworkReader().read_arrays(path, cache = True, **arguments).lengths[0]
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / 'network.xml')
+    write_network(path, '100.0', mtime_ns = 10**18)
+    return path
+
+@pytest.mark.parametrize('read', [read_length, read_array_length])
+def test_cache_is_written_and_used(path, read):
+    assert read(path) == 100.0
+    assert os.path.exists(path + matsim.network.NETWORK_CACHE_SUFFIX)
+
+    # Same size and modification time, so the stale cache is used
+    write_network(path, '200.0', mtime_ns = 10**18)
+    assert read(path) == 100.0
+
+    # Hashing the content notices the change
+    assert read(path, verify_hash = True) == 200.0
+
+def test_cache_restores_the_network(path):
+    expected = matsim.network.Network()
+    matsim.network.NetworkReader(expected).read(path)
+
+    for repetition in range(2):
+        network = matsim.network.Network()
+        matsim.network.NetworkReader(network).read(path, cache = True)
+
+        assert network.name == 'cached'
+        assert sorted(network.nodes) == ['a', 'b']
+        assert network.links['ab'].attributes == expected.links['ab'].attributes
+        assert np.array_equal(network.nodes['b'].coords, expected.nodes['b'].coords)
+
+def test_cache_is_invalidated_by_size_or_time(path):
+    assert read_length(path) == 100.0
+
+    write_network(path, '1000.0', mtime_ns = 10**18)
+    assert read_length(path) == 1000.0
+
+    write_network(path, '2000.0', mtime_ns = 2 * 10**18)
+    assert read_length(path) == 2000.0
+
+@pytest.mark.parametrize('content', [b'', b'PK\x03\x04 truncated', b'not a zip file'])
+def test_corrupt_cache_falls_back_to_xml(path, content):
+    cache_path = path + matsim.network.NETWORK_CACHE_SUFFIX
+
+    with open(cache_path, 'wb') as f:
+        f.write(content)
+
+    assert read_length(path) == 100.0
+    assert read_array_length(path) == 100.0
+
+def test_cache_with_missing_arrays_falls_back_to_xml(path):
+    read_length(path)
+    cache_path = path + matsim.network.NETWORK_CACHE_SUFFIX
+
+    with np.load(cache_path) as data:
+        key = data['key']
+
+    # Matching key but an older layout without the network arrays
+    with open(cache_path, 'wb') as f:
+        np.savez(f, key = key)
+
+    assert read_length(path) == 100.0
+
+    # The cache has been rewritten in the current layout
+    with np.load(cache_path) as data:
+        assert 'lengths' in data.files
+
+def test_no_temporary_files_are_left(path, tmp_path):
+    read_length(path)
+    assert sorted(os.listdir(str(tmp_path))) == ['network.xml', 'network.xml' + matsim.network.NETWORK_CACHE_SUFFIX]
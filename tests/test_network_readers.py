@@ -0,0 +1,75 @@
+import gzip
+import numpy as np
+import pytest
+
+import matsim.network
+
+NETWORK = '''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE network SYSTEM "http://www.matsim.org/files/dtd/network_v1.dtd">
+<network name="fixture &amp; test">
+	<nodes>
+		<node id="1" x="680405.944397" y="4826104.398738" />
+		<node id="2" x="-12.5" y="1e3" />
+		<node id="a&lt;b" x="0" y="0.000001" />
+	</nodes>
+	<links capperiod="01:00:00" effectivecellsize="7.5">
+		<link id="12" from="1" to="2" length="403.562373" freespeed="12.5" capacity="600.0" permlanes="1.0" oneway="1" modes="car" />
+		<link id="21" from="2" to="1" length="0.5" freespeed="8.33" capacity="300.0" permlanes="2.0" oneway="1" modes="car,bus" origid="77" />
+		<link id="2x" from="2" to="a&lt;b" length="10" freespeed="1" capacity="1" permlanes="1" oneway="1" modes="pt" type="rail" />
+	</links>
+</network>
+'''
+
+@pytest.fixture(params = ['network.xml', 'network.xml.gz'])
+def path(request, tmp_path):
+    path = str(tmp_path / request.param)
+
+    with (gzip.open(path, 'wt') if path.endswith('.gz') else open(path, 'w')) as f:
+        f.write(NETWORK)
+
+    return path
+
+def read_sax(path):
+    network = matsim.network.Network()
+    matsim.network.NetworkReader(network).read(path)
+    return network
+
+def test_fast_reader_matches_sax_reader(path):
+    expected = read_sax(path)
+
+    network = matsim.network.Network()
+    matsim.network.FastNetworkReader(network).read(path)
+
+    assert network.name == expected.name == 'fixture & test'
+    assert dict(network.attributes) == dict(expected.attributes)
+
+    assert list(network.nodes) == list(expected.nodes)
+    for node_id, node in expected.nodes.items():
+        assert network.nodes[node_id].id == node_id
+        assert np.array_equal(network.nodes[node_id].coords, node.coords)
+
+    assert list(network.links) == list(expected.links)
+    for link_id, link in expected.links.items():
+        other = network.links[link_id]
+        assert (other.id, other.from_node_id, other.to_node_id) == (link.id, link.from_node_id, link.to_node_id)
+        assert float(other.length) == float(link.length)
+        assert other.attributes == link.attributes
+
+def test_arrays_match_sax_reader(path):
+    expected = read_sax(path)
+    csr = matsim.network.FastNetworkReader().read_arrays(path)
+
+    assert csr.name == expected.name
+    assert csr.node_ids == list(expected.nodes)
+    assert csr.link_ids == list(expected.links)
+    assert np.array_equal(csr.coords, np.array([node.coords for node in expected.nodes.values()]))
+
+    for index, link in enumerate(expected.links.values()):
+        assert csr.node_ids[csr.from_indices[index]] == link.from_node_id
+        assert csr.node_ids[csr.to_indices[index]] == link.to_node_id
+        assert csr.lengths[index] == float(link.length)
+
+        for name, values in csr.link_attributes.items():
+            assert values[index] == link.attributes.get(name)
+
+    assert sorted(csr.link_attributes) == sorted(set(name for link in expected.links.values() for name in link.attributes))
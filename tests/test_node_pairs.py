@@ -0,0 +1,48 @@
+import matsim.network
+from networks import make_network
+
+def make_pair_network():
+    return make_network(
+        { 'a' : (0, 0), 'b' : (1, 0), 'c' : (1, 1) },
+        { 'ab' : ('a', 'b', 1.0), 'ba' : ('b', 'a', 1.0), 'bc' : ('b', 'c', 1.0) })
+
+def test_connecting_links():
+    network = make_pair_network()
+
+    assert network.get_connecting_link('a', 'b').id == 'ab'
+    assert network.get_connecting_link('b', 'a').id == 'ba'
+    assert network.get_connecting_link('a', 'c') is None
+    assert network.get_connecting_links('c', 'b') == []
+    assert network.find_duplicate_links() == []
+
+def test_index_follows_added_and_removed_links():
+    network = make_pair_network()
+    assert network.get_connecting_link('a', 'b').id == 'ab'
+
+    network.add_link(matsim.network.Link('ab2', 'a', 'b', 2.0, {}))
+    assert [link.id for link in network.get_connecting_links('a', 'b')] == ['ab', 'ab2']
+    assert [link.id for link in network.find_duplicate_links()] == ['ab2']
+
+    network.remove_link('ab')
+    assert network.get_connecting_link('a', 'b').id == 'ab2'
+
+    # Replacing a link under the same id moves it to the new pair
+    network.add_link(matsim.network.Link('ab2', 'a', 'c', 2.0, {}))
+    assert network.get_connecting_link('a', 'b') is None
+    assert network.get_connecting_link('a', 'c').id == 'ab2'
+
+def test_links_stored_directly_are_found():
+    network = make_network({ 'a' : (0, 0), 'b' : (1, 0) }, {})
+    network.links['ab'] = matsim.network.Link('ab', 'a', 'b', 1.0, {})
+
+    assert network.get_connecting_link('a', 'b').id == 'ab'
+
+    network.links['ba'] = matsim.network.Link('ba', 'b', 'a', 1.0, {})
+    assert network.get_connecting_link('b', 'a').id == 'ba'
+
+def test_dijkstra_cache_lookup():
+    network = make_pair_network()
+    cache = matsim.network.DijkstraCache(network)
+
+    assert cache.get_connecting_link_id('b', 'c') == 'bc'
+    assert cache.get_connecting_link_id('c', 'a') is None
@@ -0,0 +1,72 @@
+import pytest
+
+import matsim.pipeline
+
+COPY_SCRIPT = '''
+with open('input.txt') as f: content = f.read()
+with open('output.txt', 'w+') as f: f.write(content)
+with open('runs.txt', 'a+') as f: f.write('copy\\n')
+'''
+
+def write(path, content):
+    with open(str(path), 'w+') as f:
+        f.write(content)
+
+def count_runs(tmp_path):
+    with open(str(tmp_path / 'runs.txt')) as f:
+        return len(f.read().splitlines())
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    write(tmp_path / 'copy.py', COPY_SCRIPT)
+    write(tmp_path / 'input.txt', 'a')
+    write(tmp_path / 'library.py', 'VERSION = 1')
+
+    return tmp_path
+
+def run(code = ['library.py']):
+    stage = matsim.pipeline.Stage('copy.py', inputs = ['input.txt'], outputs = ['output.txt'])
+    return matsim.pipeline.Pipeline([stage], code = code).run()['copy']
+
+def test_stage_is_skipped_when_nothing_changed(workspace):
+    assert run() == 'finished'
+    assert run() == 'skipped'
+    assert count_runs(workspace) == 1
+
+def test_changed_input_script_or_code_invalidates(workspace):
+    assert run() == 'finished'
+
+    write(workspace / 'input.txt', 'b')
+    assert run() == 'finished'
+
+    write(workspace / 'copy.py', COPY_SCRIPT + '\n')
+    assert run() == 'finished'
+
+    write(workspace / 'library.py', 'VERSION = 2')
+    assert run() == 'finished'
+
+    assert run() == 'skipped'
+    assert count_runs(workspace) == 4
+
+def test_modified_or_missing_output_invalidates(workspace):
+    assert run() == 'finished'
+
+    write(workspace / 'output.txt', 'changed')
+    assert run() == 'finished'
+
+    (workspace / 'output.txt').unlink()
+    assert run() == 'finished'
+    assert count_runs(workspace) == 3
+
+def test_package_sources_are_part_of_the_fingerprint(workspace):
+    stage = matsim.pipeline.Stage('copy.py', inputs = ['input.txt'], outputs = ['output.txt'])
+    fingerprint = matsim.pipeline.Pipeline([stage]).get_fingerprint(stage)
+
+    assert any(path.endswith('pipeline.py') for path in fingerprint)
+    assert any(path.endswith('network.py') for path in fingerprint)
+
+def test_missing_input_fails(workspace):
+    (workspace / 'input.txt').unlink()
+    assert run() == 'failed'
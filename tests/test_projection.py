@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+import matsim.network
+import matsim.projection
+from networks import make_network
+
+pytest.importorskip('pyproj')
+
+def test_reproject_coords():
+    coords = matsim.projection.reproject_coords([(0.0, 0.0), (180.0, 0.0), (-90.0, 0.0)], 'EPSG:4326', 'EPSG:3857')
+    assert np.allclose(coords, [(0.0, 0.0), (20037508.342789244, 0.0), (-10018754.171394622, 0.0)])
+
+def test_round_trip_between_projections():
+    coords = np.array([(680405.944397, 4826104.398738), (679363.592172, 4822195.023521)])
+
+    there = matsim.projection.reproject_coords(coords, 'EPSG:26914', 'EPSG:3857')
+    back = matsim.projection.reproject_coords(there, 'EPSG:3857', 'EPSG:26914')
+
+    assert np.allclose(back, coords, atol = 1e-6)
+
+def test_reproject_network_updates_nodes_and_arrays():
+    network = make_network({ 'a' : (0.0, 0.0), 'b' : (90.0, 0.0) }, { 'ab' : ('a', 'b', 1.0) })
+    network.to_csr()
+
+    matsim.projection.reproject_network(network, 'EPSG:4326', 'EPSG:3857')
+
+    assert np.allclose(network.nodes['b'].coords, (10018754.171394622, 0.0))
+    assert np.allclose(network.to_csr().coords[network.to_csr().node_indices['b']], (10018754.171394622, 0.0))
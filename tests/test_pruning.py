@@ -0,0 +1,55 @@
+import numpy as np
+
+import matsim.network
+from networks import make_network
+
+def prune_naively(nodes, links):
+    # Removes nodes without incoming or outgoing links until nothing changes
+    nodes, links = set(nodes), dict(links)
+
+    while True:
+        starts = set(from_node_id for from_node_id, to_node_id in links.values())
+        ends = set(to_node_id for from_node_id, to_node_id in links.values())
+        removed = set(node_id for node_id in nodes if not node_id in starts or not node_id in ends)
+
+        if len(removed) == 0: return nodes, set(links)
+
+        nodes -= removed
+        links = { link_id : pair for link_id, pair in links.items() if not pair[0] in removed and not pair[1] in removed }
+
+def test_chains_are_pruned_back_to_the_cycle():
+    network = make_network(
+        { 'a' : (0, 0), 'b' : (1, 0), 'c' : (2, 0), 'd' : (3, 0), 'e' : (4, 0), 'f' : (5, 0) },
+        { 'ab' : ('a', 'b', 1), 'ba' : ('b', 'a', 1), 'bc' : ('b', 'c', 1), 'cd' : ('c', 'd', 1), 'de' : ('d', 'e', 1), 'fa' : ('f', 'a', 1) })
+
+    removed_nodes, removed_links = matsim.network.remove_sources_and_sinks(network)
+
+    assert sorted(removed_nodes) == ['c', 'd', 'e', 'f']
+    assert sorted(removed_links) == ['bc', 'cd', 'de', 'fa']
+    assert sorted(network.nodes) == ['a', 'b']
+    assert sorted(network.links) == ['ab', 'ba']
+    assert network.get_connecting_link('b', 'c') is None
+
+def test_matches_naive_pruning():
+    random = np.random.RandomState(12)
+    node_ids = ['n%d' % index for index in range(60)]
+
+    for repetition in range(5):
+        pairs = random.choice(len(node_ids), size = (90, 2))
+        links = { 'l%d' % index : (node_ids[i], node_ids[j]) for index, (i, j) in enumerate(pairs) if i != j }
+
+        network = make_network({ node_id : (0, 0) for node_id in node_ids }, { link_id : pair + (1.0,) for link_id, pair in links.items() })
+        removed_nodes, removed_links = matsim.network.remove_sources_and_sinks(network)
+
+        expected_nodes, expected_links = prune_naively(node_ids, links)
+
+        assert set(network.nodes) == expected_nodes and set(network.links) == expected_links
+        assert set(removed_nodes) == set(node_ids) - expected_nodes
+        assert set(removed_links) == set(links) - expected_links
+        assert len(removed_nodes) == len(set(removed_nodes))
+
+def test_orphaned_nodes_are_removed():
+    network = make_network({ 'a' : (0, 0), 'b' : (1, 0), 'lonely' : (5, 5) }, { 'ab' : ('a', 'b', 1), 'ba' : ('b', 'a', 1) })
+
+    removed_nodes, removed_links = matsim.network.remove_sources_and_sinks(network)
+    assert removed_nodes == ['lonely'] and removed_links == []
@@ -0,0 +1,123 @@
+import gzip
+
+import numpy as np
+import pytest
+
+import matsim.transit
+
+SCHEDULE = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<!DOCTYPE transitSchedule SYSTEM "http://www.matsim.org/files/dtd/transitSchedule_v1.dtd" [
+    <!ATTLIST transitSchedule note CDATA #IMPLIED>
+]>
+<?generator hand written?>
+<transitSchedule>
+    <transitStops>
+        <stopFacility id="a" x="0.0" y="0.0" linkRefId="la" name="Alpha" />
+        <stopFacility id="b" x="150.5" y="-20.0" linkRefId="lb" name="Beta" />
+        <stopFacility id="c" x="300.0" y="10.0" linkRefId="lc" name="Gamma" />
+    </transitStops>
+    <transitLine id="red">
+        <transitRoute id="out">
+            <transportMode>bus</transportMode>
+            <routeProfile>
+                <stop refId="a" arrivalOffset="00:00:00" departureOffset="00:00:00" awaitDeparture="false"/>
+                <stop refId="b" arrivalOffset="00:02:00" departureOffset="00:02:30" awaitDeparture="false"/>
+                <stop refId="c" arrivalOffset="00:05:00" departureOffset="00:05:00" awaitDeparture="false"/>
+            </routeProfile>
+            <route>
+                <link refId="la"/>
+                <link refId="lab"/>
+                <link refId="lb"/>
+                <link refId="lc"/>
+            </route>
+            <departures>
+                <departure id="1" departureTime="06:00:00" vehicleRefId="red_1"/>
+                <departure id="2" departureTime="06:15:00" vehicleRefId="red_2"/>
+                <departure id="3" departureTime="24:30:00" vehicleRefId="red_1"/>
+            </departures>
+        </transitRoute>
+        <transitRoute id="back">
+            <transportMode>bus</transportMode>
+            <routeProfile>
+                <stop refId="c" arrivalOffset="00:00:00" departureOffset="00:00:00" awaitDeparture="false"/>
+                <stop refId="a" arrivalOffset="00:07:00" departureOffset="00:07:00" awaitDeparture="false"/>
+            </routeProfile>
+            <route>
+                <link refId="lc"/>
+                <link refId="la"/>
+            </route>
+            <departures>
+                <departure id="1" departureTime="07:00:00" vehicleRefId="red_3"/>
+            </departures>
+        </transitRoute>
+    </transitLine>
+    <transitLine id="blue">
+        <transitRoute id="out">
+            <transportMode>bus</transportMode>
+            <routeProfile>
+                <stop refId="b" arrivalOffset="00:00:00" departureOffset="00:00:00" awaitDeparture="false"/>
+            </routeProfile>
+            <route>
+                <link refId="lb"/>
+            </route>
+            <departures>
+            </departures>
+        </transitRoute>
+    </transitLine>
+</transitSchedule>
+"""
+
+def write_schedule(path):
+    with (gzip.open(path, 'wt') if path.endswith('.gz') else open(path, 'w')) as f:
+        f.write(SCHEDULE)
+
+@pytest.mark.parametrize('name', ['schedule.xml', 'schedule.xml.gz'])
+@pytest.mark.parametrize('block_size', [5, 64, 2**20])
+def test_routes_match_the_sax_reader(tmp_path, name, block_size):
+    path = str(tmp_path / name)
+    write_schedule(path)
+
+    reference = matsim.transit.TransitSchedule()
+    matsim.transit.TransitScheduleReader(reference).read(path)
+
+    streamed = list(matsim.transit.iterate_transit_routes(path, block_size = block_size))
+    expected = [(line_id, route) for line_id, line in reference.lines.items() for route in line.routes.values()]
+
+    assert [(line_id, route.id) for line_id, route in streamed] == [(line_id, route.id) for line_id, route in expected]
+
+    for (line_id, route), (expected_line_id, expected_route) in zip(streamed, expected):
+        assert [(stop.stop_id, stop.offset) for stop in route.stops] == [(stop.stop_id, stop.offset) for stop in expected_route.stops]
+        assert route.links == expected_route.links
+
+        departures = [(item.id, item.departure_time, item.vehicle_id) for item in route.departures]
+        assert departures == [(item.id, item.departure_time, item.vehicle_id) for item in expected_route.departures]
+
+    assert len(streamed[0][1].departures) == 3
+    assert streamed[2][1].departures == []
+
+@pytest.mark.parametrize('block_size', [5, 2**20])
+def test_stop_facilities_match_the_sax_reader(tmp_path, block_size):
+    path = str(tmp_path / 'schedule.xml')
+    write_schedule(path)
+
+    reference = matsim.transit.TransitSchedule()
+    matsim.transit.TransitScheduleReader(reference).read(path)
+
+    facilities = list(matsim.transit.iterate_stop_facilities(path, block_size = block_size))
+    assert [facility.id for facility in facilities] == list(reference.stop_facilities)
+
+    for facility in facilities:
+        expected = reference.stop_facilities[facility.id]
+
+        assert np.array_equal(facility.coords, expected.coords)
+        assert (facility.link_id, facility.name) == (expected.link_id, expected.name)
+
+def test_iteration_can_stop_early(tmp_path):
+    path = str(tmp_path / 'schedule.xml')
+    write_schedule(path)
+
+    routes = matsim.transit.iterate_transit_routes(path, block_size = 16)
+    line_id, route = next(routes)
+    routes.close()
+
+    assert (line_id, route.id, len(route.stops)) == ('red', 'out', 3)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from networks import make_network
+
+@pytest.fixture
+def street_network():
+    # Two parallel streets, a diagonal, a zero length link and a long link
+    return make_network(
+        {
+            'a' : (0.0, 0.0), 'b' : (100.0, 0.0), 'c' : (0.0, 50.0), 'd' : (100.0, 50.0),
+            'e' : (400.0, 300.0), 'f' : (-300.0, 300.0)
+        },
+        {
+            'ab' : ('a', 'b', 100.0), 'ba' : ('b', 'a', 100.0), 'cd' : ('c', 'd', 100.0),
+            'ad' : ('a', 'd', 112.0), 'dd' : ('d', 'd', 0.0), 'ef' : ('e', 'f', 700.0)
+        })
+
+# find_closest_link divides by zero for the zero length link
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_snapping_matches_closest_link(street_network):
+    random = np.random.RandomState(3)
+    points = np.vstack([random.uniform(-600.0, 700.0, size = (300, 2)), [(50.0, 0.0), (100.0, 50.0), (50.0, 25.0)]])
+
+    link_ids, coords, distances = street_network.snap_to_links(points)
+
+    for point, link_id, closest, distance in zip(points, link_ids, coords, distances):
+        link = street_network.find_closest_link(point)
+        assert link.id == link_id
+        assert np.allclose(street_network.compute_closest_coords_on_link(point, link), closest)
+        assert distance == pytest.approx(street_network.compute_distance_to_link(point, link))
+
+def test_snapping_results(street_network):
+    link_ids, coords, distances = street_network.snap_to_links([(50.0, -10.0), (-20.0, 50.0), (0.0, 310.0)])
+
+    # ab and ba overlap, the smaller id wins
+    assert link_ids == ['ab', 'cd', 'ef']
+    assert np.allclose(coords, [(50.0, 0.0), (0.0, 50.0), (0.0, 300.0)])
+    assert np.allclose(distances, [10.0, 20.0, 10.0])
+
+def test_chunk_size_does_not_change_results(street_network):
+    points = np.random.RandomState(7).uniform(-100.0, 200.0, size = (50, 2))
+
+    expected = street_network.snap_to_links(points)
+    chunked = street_network.snap_to_links(points, chunk_size = 3)
+
+    assert chunked[0] == expected[0]
+    assert np.array_equal(chunked[1], expected[1]) and np.array_equal(chunked[2], expected[2])
+
+def test_snapping_without_points_or_links(street_network):
+    link_ids, coords, distances = street_network.snap_to_links(np.zeros((0, 2)))
+    assert link_ids == [] and coords.shape == (0, 2) and distances.shape == (0,)
+
+    with pytest.raises(RuntimeError):
+        make_network({ 'a' : (0, 0) }, {}).snap_to_links([(0.0, 0.0)])
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import matsim.network
+from networks import make_network
+
+def make_line():
+    return make_network(
+        { 'a' : (0.0, 0.0), 'b' : (300.0, 400.0), 'c' : (300.0, 0.0) },
+        { 'ab' : ('a', 'b', 500.0, { 'freespeed' : '13.9' }), 'bc' : ('b', 'c', 400.0), 'ca' : ('c', 'a', 300.0) })
+
+def test_split_at_two_positions():
+    network = make_line()
+    replacements = matsim.network.split_links(network, { 'ab' : [0.75, 0.25] })
+
+    assert replacements == { 'ab' : ['abb1', 'abb2', 'abb3'] }
+    assert not 'ab' in network.links
+
+    assert np.allclose(network.nodes['abb0'].coords, (75.0, 100.0))
+    assert np.allclose(network.nodes['abb1'].coords, (225.0, 300.0))
+
+    parts = [network.links[link_id] for link_id in replacements['ab']]
+
+    assert [(part.from_node_id, part.to_node_id) for part in parts] == [('a', 'abb0'), ('abb0', 'abb1'), ('abb1', 'b')]
+    assert [part.length for part in parts] == pytest.approx([125.0, 250.0, 125.0])
+    assert all(part.attributes == { 'freespeed' : '13.9' } for part in parts)
+
+    # Other links and the network caches are untouched
+    assert sorted(network.links) == ['abb1', 'abb2', 'abb3', 'bc', 'ca']
+    assert len(network.to_csr().link_ids) == 5
+
+def test_split_several_links_with_patterns():
+    network = make_line()
+    replacements = matsim.network.split_links(network, { 'bc' : [0.5], 'ca' : [0.1, 0.2, 0.3] }, node_pattern = 'n_%s_%d', link_pattern = 'l_%s_%d')
+
+    assert replacements['bc'] == ['l_bc_1', 'l_bc_2']
+    assert replacements['ca'] == ['l_ca_1', 'l_ca_2', 'l_ca_3', 'l_ca_4']
+
+    assert np.allclose(network.nodes['n_bc_0'].coords, (300.0, 200.0))
+    assert np.allclose(network.nodes['n_ca_2'].coords, (210.0, 0.0))
+    assert sum(network.links[link_id].length for link_id in replacements['ca']) == pytest.approx(300.0)
+
+def test_expand_route():
+    network = make_line()
+    replacements = matsim.network.split_links(network, { 'ab' : [0.25, 0.75], 'ca' : [0.5] })
+
+    route = ['ca', 'ab', 'bc', 'ca', 'ab']
+    expanded = matsim.network.expand_links(route, replacements)
+
+    assert expanded == ['cab1', 'cab2', 'abb1', 'abb2', 'abb3', 'bc', 'cab1', 'cab2', 'abb1', 'abb2', 'abb3']
+    assert all(link_id in network.links for link_id in expanded)
+
+    # The expanded route is still connected
+    for first, second in zip(expanded[:-1], expanded[1:]):
+        assert network.links[first].to_node_id == network.links[second].from_node_id
+
+    assert matsim.network.expand_links([], replacements) == []
+    assert matsim.network.expand_links(['bc'], {}) == ['bc']
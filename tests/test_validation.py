@@ -0,0 +1,84 @@
+import json, os, subprocess, sys
+
+import matsim.network, matsim.validation
+from networks import make_network
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE_NODES = { 'a' : (0, 0), 'b' : (100, 0), 'c' : (100, 100) }
+CORE_LINKS = {
+    'ab' : ('a', 'b', 100.0), 'ba' : ('b', 'a', 100.0), 'bc' : ('b', 'c', 100.0),
+    'cb' : ('c', 'b', 100.0), 'ca' : ('c', 'a', 141.0)
+}
+
+def make_broken_network():
+    nodes = dict(CORE_NODES, s = (-100, 0), t = (200, 100), o = (500, 500))
+    links = dict(CORE_LINKS)
+
+    links['ab2'] = ('a', 'b', 120.0)
+    links['sa'] = ('s', 'a', 100.0)
+    links['ct'] = ('c', 't', 100.0)
+    links['ax'] = ('a', 'missing', 50.0)
+    links['ba'] = ('b', 'a', 0.0)
+    links['cb'] = ('c', 'b', -5.0)
+    links['ca'] = ('c', 'a', 141.0, { 'freespeed' : '10.0', 'colour' : 'red' })
+
+    return make_network(nodes, links)
+
+def test_every_category_is_reported():
+    report = matsim.validation.validate(make_broken_network())
+
+    assert report.node_count == 6
+    assert report.link_count == 9
+    assert not report.is_valid()
+
+    assert report.dangling_links == ['ax']
+    assert report.duplicate_links == [['ab', 'ab2']]
+    assert report.sources == ['s']
+    assert report.sinks == ['t']
+    assert report.orphaned_nodes == ['o']
+    assert report.components == 4
+    assert sorted(report.disconnected_nodes) == ['o', 's', 't']
+    assert sorted(report.invalid_lengths) == ['ba', 'cb']
+    assert report.unknown_attributes == { 'colour' : ['ca'] }
+
+    lines = report.summary()
+    assert 'Found 1 links with non-existant nodes' in lines
+    assert 'Found 2 links with zero or negative length' in lines
+    assert 'Found unknown attribute "colour" on 1 links' in lines
+
+def test_valid_network():
+    report = matsim.validation.validate(make_network(CORE_NODES, CORE_LINKS))
+
+    assert report.is_valid()
+    assert report.components == 1
+    assert json.loads(json.dumps(report.to_dict()))['links'] == 5
+
+def test_nan_lengths_are_invalid():
+    links = dict(CORE_LINKS, ab = ('a', 'b', float('nan')))
+    report = matsim.validation.validate(make_network(CORE_NODES, links))
+
+    assert report.invalid_lengths == ['ab']
+
+def run_validation(*arguments):
+    return subprocess.run(
+        [sys.executable, '-m', 'matsim.validation'] + list(arguments),
+        cwd = ROOT, stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True)
+
+def test_exit_code(tmp_path):
+    valid, invalid = str(tmp_path / 'valid.xml'), str(tmp_path / 'invalid.xml.gz')
+
+    matsim.network.NetworkWriter(make_network(CORE_NODES, CORE_LINKS)).write(valid)
+    matsim.network.NetworkWriter(make_network(dict(CORE_NODES, t = (200, 100)), dict(CORE_LINKS, ct = ('c', 't', 100.0)))).write(invalid)
+
+    assert run_validation(valid).returncode == 0
+    assert run_validation(invalid).returncode == 1
+    assert run_validation(valid, invalid).returncode == 1
+    assert run_validation().returncode == 2
+
+    result = run_validation('--json', valid, invalid)
+    reports = json.loads(result.stdout)
+
+    assert result.returncode == 1
+    assert reports[valid]['sinks'] == []
+    assert reports[invalid]['sinks'] == ['t']
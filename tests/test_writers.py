@@ -0,0 +1,77 @@
+import gzip
+import numpy as np
+import pytest
+
+import matsim.network
+import matsim.utils
+from networks import make_network
+
+def make_text():
+    random = np.random.RandomState(11)
+    return ''.join('<node id="%d" x="%.6f" y="%.6f" name="Ünïcødé" />\n' % (index, x, y) for index, (x, y) in enumerate(random.uniform(0, 1e6, size = (5000, 2))))
+
+def write(path, text, **arguments):
+    with matsim.utils.BufferedWriter(path, **arguments) as writer:
+        for start in range(0, len(text), 777):
+            writer.write(text[start:start + 777])
+
+    return writer
+
+@pytest.mark.parametrize('threads', [None, 1, 2, 4])
+def test_gzip_output_decompresses_to_the_input(tmp_path, threads):
+    text = make_text()
+    path = str(tmp_path / 'output.xml.gz')
+
+    # A small buffer produces many independently compressed members
+    writer = write(path, text, buffer_size = 10000, threads = threads)
+
+    with gzip.open(path, 'rb') as f:
+        assert f.read() == text.encode('utf-8')
+
+    assert writer.get_statistics()[0] == len(text.encode('utf-8'))
+
+def test_plain_output_ignores_threads(tmp_path):
+    text = make_text()
+    path = str(tmp_path / 'output.xml')
+
+    write(path, text, buffer_size = 10000, threads = 2)
+
+    with open(path, 'rb') as f:
+        assert f.read() == text.encode('utf-8')
+
+@pytest.mark.parametrize('threads', [None, 2])
+def test_compresslevel_is_applied(tmp_path, threads):
+    text = make_text()
+    fast, small = str(tmp_path / 'fast.gz'), str(tmp_path / 'small.gz')
+
+    write(fast, text, compresslevel = 1, threads = threads)
+    write(small, text, compresslevel = 9, threads = threads)
+
+    with open(fast, 'rb') as f: fast_size = len(f.read())
+    with open(small, 'rb') as f: small_size = len(f.read())
+
+    assert small_size < fast_size
+
+    with gzip.open(fast, 'rb') as f:
+        assert f.read() == text.encode('utf-8')
+
+def test_network_writer_output_is_independent_of_compression(tmp_path):
+    network = make_network(
+        { 'a' : (0.5, 1.25), 'b' : (1e6, -3.0) },
+        { 'ab' : ('a', 'b', 12.5, { 'freespeed' : '13.9', 'modes' : 'car,bus' }), 'ba' : ('b', 'a', 12.5, { 'freespeed' : '13.9' }) },
+        name = 'writer test')
+
+    plain, compressed = str(tmp_path / 'network.xml'), str(tmp_path / 'network.xml.gz')
+    matsim.network.NetworkWriter(network).write(plain)
+    matsim.network.NetworkWriter(network).write(compressed, compresslevel = 1, threads = 2)
+
+    with open(plain, 'rb') as f, gzip.open(compressed, 'rb') as g:
+        assert f.read() == g.read()
+
+    restored = matsim.network.Network()
+    matsim.network.NetworkReader(restored).read(compressed)
+
+    assert restored.name == 'writer test'
+    assert restored.links['ab'].attributes == { 'freespeed' : '13.9', 'modes' : 'car,bus' }
+    assert float(restored.links['ab'].length) == 12.5
+    assert np.allclose(restored.nodes['b'].coords, (1e6, -3.0))